@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
-import subprocess
-import sys
+import time
+
+# Medir o tempo de importação (exibido na inicialização do servidor)
+_inicio_importacao = time.perf_counter()
+
 import os
 import tempfile
 import logging
@@ -9,44 +12,310 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Instalar dependências automaticamente
-def install_packages():
-    packages = [
-        'Flask==2.3.3',
-        'pdfplumber==0.10.3', 
-        'pandas==2.0.3',
-        'openpyxl==3.1.2'
-    ]
-    for package in packages:
-        try:
-            logger.info(f"Instalando {package}...")
-            subprocess.check_call([sys.executable, "-m", "pip", "install", package], 
-                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        except Exception as e:
-            logger.error(f"Erro ao instalar {package}: {e}")
+# Dependências vêm do requirements.txt; nada é instalado em tempo de execução
+from flask import Flask, Request, g, request, Response, jsonify, send_file
+import pdfplumber
+from pdfminer.pdftypes import PDFStream, resolve1
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+# Backend de extração rápido (opcional): PDF_BACKEND=pdfium
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
 
-# Tentar importar, se falhar, instalar
+# Escritor de XLSX rápido (opcional): formato=xlsxwriter
 try:
-    from flask import Flask, request, Response, jsonify
-    import pdfplumber
-    import pandas as pd
+    import xlsxwriter
 except ImportError:
-    print("Instalando dependências...")
-    install_packages()
-    from flask import Flask, request, Response, jsonify
-    import pdfplumber
-    import pandas as pd
+    xlsxwriter = None
 
+# Vagas de conversão compartilhadas entre processos (flock); sem fcntl, limite só por processo
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import cProfile
+import contextvars
+import csv
+import functools
+import hashlib
+import importlib.util
+import json
+import math
+import pickle
 import re
+import shutil
+import sqlite3
+import stat
+import threading
 import uuid
-from io import BytesIO
+import zipfile
+from array import array
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import closing, contextmanager, nullcontext
+from datetime import datetime
+from io import BytesIO, TextIOWrapper
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+class RequestComSpool(Request):
+    """Recebe uploads em um SpooledTemporaryFile com limite de memória configurável"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=app.config["UPLOAD_SPOOL_MAX_MEMORY"],
+                                             dir=pasta_temporaria())
+
+    def _load_form_data(self):
+        # Leitura do corpo multipart para o spool
+        with etapa("upload"):
+            super()._load_form_data()
 
 app = Flask(__name__)
+app.request_class = RequestComSpool
 
 # Configuração melhorada
 app.config["MAX_CONTENT_LENGTH"] = 50 * 1024 * 1024  # 50MB max
 app.config["UPLOAD_FOLDER"] = tempfile.gettempdir()
 app.config["OUTPUT_FOLDER"] = tempfile.gettempdir()
+# Espaço de rascunho: uma pasta por requisição (uploads, cópias e arquivos intermediários)
+app.config["SCRATCH_FOLDER"] = os.environ.get("SCRATCH_FOLDER", os.path.join(tempfile.gettempdir(), "pdf-converter-scratch"))
+app.config["SCRATCH_MAX_BYTES"] = int(os.environ.get("SCRATCH_MAX_BYTES", 1024 * 1024 * 1024))
+app.config["SCRATCH_TTL"] = int(os.environ.get("SCRATCH_TTL", 3600))  # segundos
+# Uploads até este tamanho ficam só em memória; acima disso vão para um arquivo temporário
+app.config["UPLOAD_SPOOL_MAX_MEMORY"] = int(os.environ.get("UPLOAD_SPOOL_MAX_MEMORY", 16 * 1024 * 1024))
+# Processos usados na extração de páginas (1 = extração sequencial)
+app.config["PDF_WORKERS"] = int(os.environ.get("PDF_WORKERS", 1))
+# Backend de extração de texto: "pdfplumber" (padrão, análise de layout completa) ou "pdfium"
+app.config["PDF_BACKEND"] = os.environ.get("PDF_BACKEND", "pdfplumber")
+# Gera o Excel em fluxo contínuo (memória constante) em vez de montar um DataFrame
+app.config["XLSX_STREAMING"] = os.environ.get("XLSX_STREAMING", "0") == "1"
+# Conversões assíncronas (/jobs)
+app.config["JOBS_FOLDER"] = os.path.join(app.config["OUTPUT_FOLDER"], "pdf-converter-jobs")
+app.config["JOB_WORKERS"] = int(os.environ.get("JOB_WORKERS", 2))
+app.config["JOB_QUEUE_SIZE"] = int(os.environ.get("JOB_QUEUE_SIZE", 8))
+app.config["JOB_TTL"] = int(os.environ.get("JOB_TTL", 3600))  # segundos
+# Conversão em lote (/lote): processos convertendo PDFs em paralelo e limite de arquivos
+app.config["BATCH_WORKERS"] = int(os.environ.get("BATCH_WORKERS", 2))
+app.config["BATCH_MAX_FILES"] = int(os.environ.get("BATCH_MAX_FILES", 50))
+# Cache de resultados por conteúdo do PDF
+app.config["CACHE_ENABLED"] = os.environ.get("CACHE_ENABLED", "1") == "1"
+app.config["CACHE_FOLDER"] = os.environ.get("CACHE_FOLDER", os.path.join(tempfile.gettempdir(), "pdf-converter-cache"))
+app.config["CACHE_MAX_BYTES"] = int(os.environ.get("CACHE_MAX_BYTES", 200 * 1024 * 1024))
+app.config["CACHE_TTL"] = int(os.environ.get("CACHE_TTL", 24 * 3600))  # segundos
+# Cache por página: só páginas novas ou alteradas passam pela extração de texto
+app.config["PAGE_CACHE_ENABLED"] = os.environ.get("PAGE_CACHE_ENABLED", "1") == "1"
+app.config["PAGE_CACHE_FOLDER"] = os.path.join(app.config["CACHE_FOLDER"], "paginas")
+app.config["PAGE_CACHE_MAX_BYTES"] = int(os.environ.get("PAGE_CACHE_MAX_BYTES", 100 * 1024 * 1024))
+# Entradas por página são endereçadas pelo conteúdo e nunca ficam desatualizadas: o TTL
+# longo só limpa páginas esquecidas, o descarte normal é o LRU por tamanho
+app.config["PAGE_CACHE_TTL"] = int(os.environ.get("PAGE_CACHE_TTL", 30 * 24 * 3600))  # segundos
+# Índice SQLite dos relatórios convertidos, consultado por /consulta sem reprocessar o PDF
+app.config["INDEX_ENABLED"] = os.environ.get("INDEX_ENABLED", "1") == "1"
+app.config["INDEX_PATH"] = os.environ.get("INDEX_PATH", os.path.join(tempfile.gettempdir(), "pdf-converter-indice.sqlite3"))
+app.config["INDEX_MAX_REPORTS"] = int(os.environ.get("INDEX_MAX_REPORTS", 100))
+# Perfil cProfile por requisição: todas (PROFILE_REQUESTS=1) ou as que enviarem
+# o cabeçalho X-Profile com o valor de PROFILE_TOKEN
+app.config["PROFILE_REQUESTS"] = os.environ.get("PROFILE_REQUESTS", "0") == "1"
+app.config["PROFILE_TOKEN"] = os.environ.get("PROFILE_TOKEN", "")
+app.config["PROFILE_FOLDER"] = os.environ.get("PROFILE_FOLDER", os.path.join(tempfile.gettempdir(), "pdf-converter-perfis"))
+# Controle de admissão das conversões (0 desativa cada limite)
+app.config["MAX_CONCURRENT_CONVERSIONS"] = int(os.environ.get("MAX_CONCURRENT_CONVERSIONS", 2))
+app.config["ADMISSION_WAIT"] = float(os.environ.get("ADMISSION_WAIT", 0))  # segundos esperando uma vaga
+app.config["ADMISSION_FOLDER"] = os.environ.get("ADMISSION_FOLDER", os.path.join(tempfile.gettempdir(), "pdf-converter-vagas"))
+app.config["PAGE_BUDGET"] = int(os.environ.get("PAGE_BUDGET", 2000))  # páginas em extração por processo
+app.config["BUSY_RETRY_AFTER"] = int(os.environ.get("BUSY_RETRY_AFTER", 5))  # segundos
+app.config["RATE_LIMIT_PER_MINUTE"] = int(os.environ.get("RATE_LIMIT_PER_MINUTE", 30))
+app.config["RATE_LIMIT_BURST"] = int(os.environ.get("RATE_LIMIT_BURST", 10))
+# O deploy (Procfile) roda atrás do roteador do Heroku, que esconde o IP do cliente:
+# sem o X-Forwarded-For todos dividiriam o mesmo balde do limite de taxa. Use
+# TRUST_PROXY=0 só ao expor o servidor direto, sem proxy na frente
+app.config["TRUST_PROXY"] = os.environ.get("TRUST_PROXY", "1") == "1"
+if app.config["TRUST_PROXY"]:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+
+class Cronometro:
+    """Tempo de cada etapa de uma conversão e contagens (páginas, linhas, cache).
+
+    Etapas podem ser aninhadas: o tempo de uma etapa interna é descontado da
+    externa, então a soma das etapas não conta nada duas vezes. Os tempos
+    medidos nos processos do pool ficam à parte, em processos: são somados de
+    vários processos ao mesmo tempo e não cabem no tempo de relógio da conversão.
+    """
+
+    def __init__(self):
+        self.etapas = {}
+        self.processos = {}
+        self.contagens = {}
+        self._pilha = []
+
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        self._pilha.append(0.0)
+        try:
+            yield
+        finally:
+            internas = self._pilha.pop()
+            duracao = time.perf_counter() - inicio
+            self.etapas[nome] = self.etapas.get(nome, 0.0) + max(0.0, duracao - internas)
+            if self._pilha:
+                self._pilha[-1] += duracao
+
+    def contar(self, nome, quantidade=1):
+        self.contagens[nome] = self.contagens.get(nome, 0) + quantidade
+
+    def somar(self, etapas, contagens):
+        """Inclui tempos e contagens medidos em outro processo"""
+        for nome, segundos in etapas.items():
+            self.processos[nome] = self.processos.get(nome, 0.0) + segundos
+        for nome, quantidade in contagens.items():
+            self.contar(nome, quantidade)
+
+# Cronômetro da conversão em andamento (requisição ou job) no contexto atual
+_cronometro = contextvars.ContextVar("cronometro", default=None)
+
+def etapa(nome):
+    """Mede um trecho no cronômetro atual; sem efeito fora de uma conversão"""
+    cronometro = _cronometro.get()
+    return cronometro.etapa(nome) if cronometro is not None else nullcontext()
+
+def contar(nome, quantidade=1):
+    cronometro = _cronometro.get()
+    if cronometro is not None:
+        cronometro.contar(nome, quantidade)
+
+class Metricas:
+    """Contadores, medidores e histogramas exportados no formato texto do Prometheus.
+
+    Os valores ficam na memória do processo: com vários workers do gunicorn,
+    cada coleta de /metrics reflete o worker que atendeu a requisição.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._definicoes = {}
+        self._valores = {}
+
+    def definir(self, nome, tipo, ajuda, buckets=None, funcao=None):
+        self._definicoes[nome] = (tipo, ajuda, buckets, funcao)
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def observar(self, nome, valor, **rotulos):
+        buckets = self._definicoes[nome][2]
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            serie = self._valores.get(chave)
+            if serie is None:
+                # Contagem por bucket, depois soma e total de observações
+                serie = self._valores[chave] = [0] * len(buckets) + [0.0, 0]
+            for i, limite in enumerate(buckets):
+                if valor <= limite:
+                    serie[i] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    @staticmethod
+    def _rotulos(rotulos, extra=()):
+        pares = [*rotulos, *extra]
+        if not pares:
+            return ""
+        return "{" + ",".join(f'{nome}="{valor}"' for nome, valor in pares) + "}"
+
+    def exportar(self):
+        with self._lock:
+            valores = {chave: (list(valor) if isinstance(valor, list) else valor)
+                       for chave, valor in self._valores.items()}
+        linhas = []
+        for nome, (tipo, ajuda, buckets, funcao) in self._definicoes.items():
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            if funcao is not None:
+                linhas.append(f"{nome} {funcao()}")
+                continue
+            for (serie_nome, rotulos), valor in sorted(valores.items()):
+                if serie_nome != nome:
+                    continue
+                if tipo != "histogram":
+                    linhas.append(f"{nome}{self._rotulos(rotulos)} {valor}")
+                    continue
+                for limite, quantidade in zip(buckets, valor):
+                    linhas.append(f"{nome}_bucket{self._rotulos(rotulos, [('le', limite)])} {quantidade}")
+                linhas.append(f"{nome}_bucket{self._rotulos(rotulos, [('le', '+Inf')])} {valor[-1]}")
+                linhas.append(f"{nome}_sum{self._rotulos(rotulos)} {valor[-2]}")
+                linhas.append(f"{nome}_count{self._rotulos(rotulos)} {valor[-1]}")
+        return "\n".join(linhas) + "\n"
+
+metricas = Metricas()
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+metricas.definir("conversor_requisicoes_total", "counter", "Requisições HTTP por rota e status")
+metricas.definir("conversor_requisicao_segundos", "histogram", "Duração das requisições HTTP por rota", BUCKETS_SEGUNDOS)
+metricas.definir("conversor_etapa_segundos", "histogram", "Tempo gasto em cada etapa da conversão", BUCKETS_SEGUNDOS)
+metricas.definir("conversor_etapa_processos_segundos", "histogram",
+                 "Tempo das etapas executadas nos processos do pool, somado entre os processos", BUCKETS_SEGUNDOS)
+metricas.definir("conversor_paginas_total", "counter", "Páginas de PDF processadas")
+metricas.definir("conversor_linhas_total", "counter", "Títulos extraídos")
+metricas.definir("conversor_paginas_por_segundo", "histogram", "Vazão de páginas por conversão",
+                 (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500))
+metricas.definir("conversor_linhas_por_segundo", "histogram", "Vazão de títulos por conversão",
+                 (100, 500, 1000, 5000, 10000, 25000, 50000, 100000, 250000))
+metricas.definir("conversor_bytes_recebidos_total", "counter", "Bytes recebidos nos corpos das requisições")
+metricas.definir("conversor_bytes_enviados_total", "counter", "Bytes enviados nos corpos das respostas")
+metricas.definir("conversor_cache_total", "counter", "Consultas aos caches de resultados e de páginas")
+metricas.definir("conversor_rascunho_rejeicoes_total", "counter", "Envios recusados por falta de espaço de rascunho")
+metricas.definir("conversor_admissao_rejeicoes_total", "counter", "Requisições recusadas pelo controle de admissão, por motivo")
+metricas.definir("conversor_conversoes_ativas", "gauge", "Conversões síncronas em andamento neste processo",
+                 funcao=lambda: _conversoes_ativas)
+metricas.definir("conversor_rascunho_bytes", "gauge", "Bytes em uso ou reservados no espaço de rascunho",
+                 funcao=lambda: espaco_temporario().uso())
+
+def registrar_conversao(cronometro):
+    """Envia para as métricas os tempos e contagens de uma conversão concluída"""
+    for nome, segundos in cronometro.etapas.items():
+        metricas.observar("conversor_etapa_segundos", segundos, etapa=nome)
+    for nome, segundos in cronometro.processos.items():
+        metricas.observar("conversor_etapa_processos_segundos", segundos, etapa=nome)
+    for nome, quantidade in cronometro.contagens.items():
+        if nome.startswith("cache_"):
+            cache, resultado = nome[len("cache_"):].rsplit("_", 1)
+            metricas.incrementar("conversor_cache_total", quantidade, cache=cache, resultado=resultado)
+    paginas = cronometro.contagens.get("paginas", 0)
+    linhas = cronometro.contagens.get("linhas", 0)
+    metricas.incrementar("conversor_paginas_total", paginas)
+    metricas.incrementar("conversor_linhas_total", linhas)
+    # Só tempo de relógio: a espera pelos processos do pool é a etapa aguardar_processos
+    duracao = sum(cronometro.etapas.values())
+    if paginas and duracao > 0:
+        metricas.observar("conversor_paginas_por_segundo", paginas / duracao)
+        metricas.observar("conversor_linhas_por_segundo", linhas / duracao)
+
+# Colunas da planilha "Pendências"
+COLUNAS = [
+    "Código Cliente", "Cliente", "Telefone", "Cidade", "Documento", "Emissão",
+    "Vencimento", "ATS", "Tipo", "Boleto", "Valor Documento", "Juros", "Multa", "Tarifa", "Valor Total"
+]
+COLUNAS_NUMERICAS = ["Valor Documento", "Juros", "Multa", "Tarifa", "Valor Total"]
+COLUNAS_DATAS = ["Emissão", "Vencimento"]
+# Posições dessas colunas nas linhas (ordem de COLUNAS); as demais são gravadas como texto
+INDICES_NUMERICOS = tuple(COLUNAS.index(col) for col in COLUNAS_NUMERICAS)
+INDICES_DATAS = tuple(COLUNAS.index(col) for col in COLUNAS_DATAS)
+INDICES_TEXTO = tuple(i for i in range(len(COLUNAS)) if i not in INDICES_DATAS)
+# Formato de exibição das datas no Excel
+FORMATO_DATA_EXCEL = "DD/MM/YYYY"
+# Larguras de coluna: datas ocupam "dd/mm/aaaa" e nenhuma coluna passa de 50 caracteres
+LARGURA_DATA = len(FORMATO_DATA_EXCEL)
+LARGURA_MAXIMA = 50
+
+MIMETYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 # Regex otimizadas para o formato específico do PDF
 try:
@@ -62,13 +331,52 @@ try:
     regex_titulo_cart = re.compile(
         r"^(\d+\.\d+)\s+(\d{1,2}/\d{1,2}/\d{4})\s+(\d{1,2}/\d{1,2}/\d{4})\s+(\d+)\s+(CART)\s+([\d,.]+)\s+([\d,.]+)\s+([\d,.]+)\s+([\d,.]+)\s+([\d,.]+)$"
     )
-    
-    # Regex para detectar linhas de separação ou totais que devem ser ignoradas
-    regex_ignorar = re.compile(r"^(TOTAL|Limite|[-=]+|Docto|Vencidas|Total|Financeiro|LB Palmas|Pendencia|Rota|Somente).*")
-    
+
+    # Classificação em uma única passada: as três regex acima, sem as âncoras,
+    # combinadas em uma alternância. São a única fonte das regras; alterar uma
+    # delas altera a classificação. Grupos: 0-10 BANC, 11-20 CART, 21-25 cliente
+    regex_linha = re.compile("^(?:" + "|".join(
+        regex.pattern.removeprefix("^").removesuffix("$")
+        for regex in (regex_titulo_banc, regex_titulo_cart, regex_cliente)
+    ) + ")$")
+
 except re.error as e:
     logger.error(f"Erro nas expressões regulares: {e}")
 
+Cliente = namedtuple("Cliente", ["codigo", "nome", "telefone", "cidade"])
+Titulo = namedtuple("Titulo", [
+    "documento", "emissao", "vencimento", "ats", "tipo", "boleto",
+    "valor_doc", "juros", "multa", "tarifa", "valor_total",
+])
+_novo_registro = tuple.__new__
+
+def classificar_linha(linha):
+    """Classifica uma linha (já sem espaços nas pontas) como Cliente, Titulo ou None"""
+    # Clientes e títulos começam com dígito; cabeçalhos, totais e separadores
+    # nunca começam, então são descartados sem regex
+    if not linha[:1].isdecimal():
+        return None
+    match = regex_linha.match(linha)
+    if match is None:
+        return None
+
+    grupos = match.groups()
+    if grupos[0] is not None:
+        return _novo_registro(Titulo, grupos[:11])
+    if grupos[11] is not None:
+        # CART não tem boleto
+        return _novo_registro(Titulo, grupos[11:16] + ("",) + grupos[16:21])
+    codigo, nome, ddd, numero, cidade = grupos[21:]
+    return Cliente(codigo.strip(), nome.strip(), f"({ddd}){numero}", cidade.strip())
+
+# Versão da saída: incrementar quando mudar o conteúdo gerado sem mudar as regex
+VERSAO_SAIDA = 3
+
+# Identifica as regras de extração nas chaves de cache
+VERSAO_PARSER = hashlib.sha256("\n".join([
+    str(VERSAO_SAIDA), regex_linha.pattern, *COLUNAS,
+]).encode("utf-8")).hexdigest()[:12]
+
 def limpar_valor_numerico(valor_str):
     """Limpa e converte string para float"""
     try:
@@ -80,163 +388,1794 @@ def limpar_valor_numerico(valor_str):
     except (ValueError, AttributeError):
         return 0.0
 
-def processar_pdf(pdf_path, output_path):
-    """Processa PDF e gera Excel com tratamento de erros melhorado"""
-    dados = []
-    cliente_atual = None
-    cidade_atual = None
-    telefone_atual = None
-    codigo_cliente_atual = None
-    
+def converter_valores_numericos(valores):
+    """Converte em lote uma coluna de valores "1.234,56" para float.
+
+    Mesmo resultado de limpar_valor_numerico aplicado valor a valor: vazios e
+    inválidos viram 0.0.
+    """
+    limpos = pd.Series(valores).str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            logger.info(f"Processando PDF com {len(pdf.pages)} páginas")
-            
-            for page_num, page in enumerate(pdf.pages, 1):
+        return limpos.astype("float64").fillna(0.0)
+    except (ValueError, TypeError):
+        # Há valores inválidos na coluna: zerar apenas esses
+        return pd.to_numeric(limpos, errors="coerce").astype("float64").fillna(0.0)
+
+def converter_datas(valores):
+    """Converte em lote uma coluna de datas "dd/mm/aaaa" (inválidas viram NaT)"""
+    return pd.to_datetime(pd.Series(valores), format="%d/%m/%Y", errors="coerce")
+
+def converter_data(valor_str):
+    """Converte uma data "dd/mm/aaaa" (inválida vira None)"""
+    try:
+        return datetime.strptime(valor_str, "%d/%m/%Y")
+    except (ValueError, TypeError):
+        return None
+
+class _Dicionario:
+    """Valores distintos de uma coluna, codificados na ordem em que aparecem"""
+
+    def __init__(self):
+        self.codigos = {}
+
+    def codigo(self, valor):
+        codigo = self.codigos.get(valor)
+        if codigo is None:
+            codigo = self.codigos[valor] = len(self.codigos)
+        return codigo
+
+    def valores(self):
+        return list(self.codigos)
+
+class BufferColunar:
+    """Acumula as linhas de títulos em colunas em vez de listas de 15 strings.
+
+    Os valores vão para arrays de float (convertidos em blocos), e clientes,
+    datas, ATS e tipo ficam codificados por dicionário: uma tabela de valores
+    distintos e um array de índices por linha.
+    """
+
+    TAMANHO_BLOCO = 4096
+
+    def __init__(self):
+        self.clientes = _Dicionario()
+        self.datas = _Dicionario()
+        self.ats = _Dicionario()
+        self.tipos = _Dicionario()
+        self.indice_cliente = array("i")
+        self.indice_emissao = array("i")
+        self.indice_vencimento = array("i")
+        self.indice_ats = array("i")
+        self.indice_tipo = array("i")
+        self.documentos = []
+        self.boletos = []
+        self.valores = [array("d") for _ in COLUNAS_NUMERICAS]
+        self._valores_pendentes = [[] for _ in COLUNAS_NUMERICAS]
+
+    def __len__(self):
+        return len(self.documentos)
+
+    def append(self, linha):
+        """Adiciona uma linha no formato de COLUNAS"""
+        self.indice_cliente.append(self.clientes.codigo(tuple(linha[:4])))
+        documento, emissao, vencimento, ats, tipo, boleto = linha[4:10]
+        self.documentos.append(documento)
+        self.indice_emissao.append(self.datas.codigo(emissao))
+        self.indice_vencimento.append(self.datas.codigo(vencimento))
+        self.indice_ats.append(self.ats.codigo(ats))
+        self.indice_tipo.append(self.tipos.codigo(tipo))
+        self.boletos.append(boleto)
+        for pendentes, valor in zip(self._valores_pendentes, linha[10:]):
+            pendentes.append(valor)
+        if len(self._valores_pendentes[0]) >= self.TAMANHO_BLOCO:
+            self._converter_pendentes()
+
+    def _converter_pendentes(self):
+        with etapa("converter_valores"):
+            for valores, pendentes in zip(self.valores, self._valores_pendentes):
+                if pendentes:
+                    convertidos = converter_valores_numericos(pendentes).to_numpy(dtype=np.float64)
+                    valores.frombytes(convertidos.tobytes())
+                    pendentes.clear()
+
+    @staticmethod
+    def _categorias(dicionario, indices):
+        return pd.Categorical.from_codes(np.frombuffer(indices, dtype=np.intc), categories=dicionario.valores())
+
+    def para_dataframe(self):
+        """Monta o DataFrame sem copiar as colunas numéricas"""
+        with etapa("dataframe"):
+            return self._montar_dataframe()
+
+    def _montar_dataframe(self):
+        self._converter_pendentes()
+        indice_cliente = np.frombuffer(self.indice_cliente, dtype=np.intc)
+        clientes = self.clientes.valores()
+
+        colunas = {}
+        for posicao, nome in enumerate(COLUNAS[:4]):
+            # Cada campo do cliente vira uma coluna categórica via a tabela de clientes
+            campo = _Dicionario()
+            codigos = np.array([campo.codigo(cliente[posicao]) for cliente in clientes], dtype=np.intc)
+            colunas[nome] = pd.Categorical.from_codes(codigos[indice_cliente], categories=campo.valores())
+
+        # Datas distintas são convertidas uma única vez
+        datas = converter_datas(self.datas.valores()).to_numpy()
+        colunas["Documento"] = self.documentos
+        colunas["Emissão"] = datas[np.frombuffer(self.indice_emissao, dtype=np.intc)]
+        colunas["Vencimento"] = datas[np.frombuffer(self.indice_vencimento, dtype=np.intc)]
+        colunas["ATS"] = self._categorias(self.ats, self.indice_ats)
+        colunas["Tipo"] = self._categorias(self.tipos, self.indice_tipo)
+        colunas["Boleto"] = self.boletos
+        for nome, valores in zip(COLUNAS_NUMERICAS, self.valores):
+            colunas[nome] = np.frombuffer(valores, dtype=np.float64)
+
+        return pd.DataFrame(colunas, columns=COLUNAS, copy=False)
+
+def parsear_pagina(texto, page_num):
+    """Classifica as linhas de uma página sem depender das páginas anteriores.
+
+    Retorna (orfaos, registros, contexto_final): títulos encontrados antes do
+    primeiro cliente da página, linhas completas de clientes da própria página
+    e o último cliente visto (ou None, se a página não tiver cliente).
+    """
+    orfaos = []
+    registros = []
+    contexto_final = None
+    clientes = 0
+
+    linhas = texto.split("\n")
+    # Detalhes por linha só em DEBUG; em INFO o laço não monta nenhuma mensagem
+    detalhar = logger.isEnabledFor(logging.DEBUG)
+
+    for linha_num, linha in enumerate(linhas, 1):
+        linha = linha.strip()
+
+        # Ignorar linhas vazias ou separadores
+        if len(linha) < 5:
+            continue
+
+        # Debug: mostrar as primeiras linhas de cada página
+        if detalhar and linha_num <= 10:
+            logger.debug("Página %d, Linha %d: %s", page_num, linha_num, linha)
+
+        registro = classificar_linha(linha)
+        if registro is None:
+            continue
+
+        if type(registro) is Cliente:
+            contexto_final = registro
+            clientes += 1
+            if detalhar:
+                logger.debug("Cliente encontrado: %s - %s", registro.codigo, registro.nome)
+        elif contexto_final is None:
+            # Cliente ainda desconhecido: vem de uma página anterior
+            orfaos.append(list(registro))
+            if detalhar:
+                logger.debug("Título %s encontrado: %s", registro.tipo, registro.documento)
+        elif contexto_final.nome:
+            registros.append([*contexto_final, *registro])
+            if detalhar:
+                logger.debug("Título %s encontrado: %s - %s", registro.tipo, registro.documento, contexto_final.nome)
+
+    if detalhar:
+        logger.debug("Página %d: %d linhas, %d clientes, %d títulos (%d do cliente da página anterior)",
+                     page_num, len(linhas), clientes, len(registros) + len(orfaos), len(orfaos))
+    return orfaos, registros, contexto_final
+
+def combinar_paginas(resultados):
+    """Junta os resultados por página em ordem, propagando o cliente entre páginas.
+
+    Ao final registra um resumo do documento em vez de uma mensagem por linha.
+    """
+    contexto = None
+    paginas = titulos = descartados = 0
+    for orfaos, registros, contexto_final in resultados:
+        paginas += 1
+        # Títulos do topo da página pertencem ao último cliente das páginas anteriores
+        if contexto and contexto[1]:
+            for titulo in orfaos:
+                yield [*contexto, *titulo]
+            titulos += len(orfaos)
+        else:
+            descartados += len(orfaos)
+        yield from registros
+        titulos += len(registros)
+        if contexto_final is not None:
+            contexto = contexto_final
+
+    logger.info(f"Documento: {paginas} páginas, {titulos} títulos extraídos")
+    if descartados:
+        logger.warning(f"{descartados} títulos ignorados por não terem cliente identificado")
+
+def _atualizar_hash(sha256, obj, chave="", profundidade=0):
+    """Inclui no hash um objeto PDF, resolvendo referências"""
+    if profundidade > 8:
+        return
+    obj = resolve1(obj)
+    if isinstance(obj, PDFStream):
+        _atualizar_hash(sha256, obj.attrs, chave, profundidade + 1)
+        # Programas de fonte e imagens não alteram o texto extraído
+        subtipo = getattr(obj.get("Subtype"), "name", None)
+        if not chave.startswith("FontFile") and subtipo != "Image":
+            sha256.update(obj.get_data())
+    elif isinstance(obj, dict):
+        for nome in sorted(obj):
+            sha256.update(f"/{nome}".encode("utf-8"))
+            _atualizar_hash(sha256, obj[nome], nome, profundidade + 1)
+    elif isinstance(obj, list):
+        sha256.update(b"[")
+        for item in obj:
+            _atualizar_hash(sha256, item, chave, profundidade + 1)
+        sha256.update(b"]")
+    else:
+        sha256.update(repr(obj).encode("utf-8"))
+
+def hash_pagina(page):
+    """SHA-256 do que determina o texto da página: conteúdo, recursos e geometria"""
+    sha256 = hashlib.sha256(VERSAO_PARSER.encode("utf-8"))
+    sha256.update(repr((page.bbox, page.rotation)).encode("utf-8"))
+    for stream in page.page_obj.contents:
+        sha256.update(resolve1(stream).get_data())
+    _atualizar_hash(sha256, page.page_obj.resources)
+    return sha256.hexdigest()
+
+class ExtratorPdfplumber:
+    """Extração padrão: texto montado pela análise de caracteres e layout do pdfplumber"""
+
+    nome = "pdfplumber"
+
+    def __init__(self, fonte):
+        self._pdf = pdfplumber.open(fonte)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._pdf.close()
+
+    def __len__(self):
+        return len(self._pdf.pages)
+
+    def pagina(self, indice):
+        return self._pdf.pages[indice]
+
+    def texto(self, pagina):
+        return pagina.extract_text()
+
+    def hash(self, pagina):
+        return hash_pagina(pagina)
+
+    def liberar(self, pagina):
+        # Liberar objetos de layout já usados
+        pagina.close()
+
+# O PDFium não é thread-safe: as chamadas de todas as threads passam por este lock
+_lock_pdfium = threading.Lock()
+
+def _lock_pdfium_no_filho():
+    global _lock_pdfium
+    _lock_pdfium = threading.Lock()
+
+# Os pools de processos usam fork: o lock é tomado durante o fork para que
+# nenhuma thread esteja dentro do PDFium nesse instante, e o filho recebe um
+# lock novo em vez da cópia travada
+os.register_at_fork(before=lambda: _lock_pdfium.acquire(), after_in_parent=lambda: _lock_pdfium.release(),
+                    after_in_child=_lock_pdfium_no_filho)
+
+class ExtratorPdfium:
+    """Extração rápida pelo PDFium, sem a análise de layout do pdfplumber.
+
+    Os relatórios têm layout fixo em texto simples, então a ordem de leitura do
+    PDFium produz as mesmas linhas (verificado por tests/test_paridade.py).
+    Não há hash de página: a extração é rápida o bastante para dispensar o cache por página.
+    """
+
+    nome = "pdfium"
+
+    def __init__(self, fonte):
+        if pdfium is None:
+            raise Exception("Backend pdfium indisponível: instale o pacote pypdfium2")
+        with _lock_pdfium:
+            self._pdf = pdfium.PdfDocument(fonte)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        with _lock_pdfium:
+            self._pdf.close()
+
+    def __len__(self):
+        return len(self._pdf)
+
+    def pagina(self, indice):
+        return indice
+
+    def texto(self, pagina):
+        with _lock_pdfium:
+            page = self._pdf[pagina]
+            try:
+                textpage = page.get_textpage()
                 try:
-                    texto = page.extract_text()
-                    if not texto:
-                        logger.warning(f"Página {page_num} não contém texto extraível")
-                        continue
-                        
-                    linhas = texto.split("\n")
-                    logger.info(f"Processando {len(linhas)} linhas da página {page_num}")
-                    
-                    for linha_num, linha in enumerate(linhas, 1):
-                        linha = linha.strip()
-                        
-                        # Ignorar linhas vazias ou separadores
-                        if not linha or len(linha) < 5:
-                            continue
-                            
-                        # Ignorar linhas que sabemos que não contêm dados úteis
-                        if regex_ignorar.match(linha):
-                            continue
-                            
-                        # Debug: mostrar as primeiras linhas de cada página
-                        if linha_num <= 10:
-                            logger.debug(f"Página {page_num}, Linha {linha_num}: {linha}")
-                            
-                        # Tentar match com regex de cliente
-                        try:
-                            match_cliente = regex_cliente.match(linha)
-                            if match_cliente:
-                                codigo_cliente_atual = match_cliente.group(1).strip()
-                                cliente_atual = match_cliente.group(2).strip()
-                                ddd = match_cliente.group(3).strip()
-                                numero = match_cliente.group(4).strip()
-                                telefone_atual = f"({ddd}){numero}"
-                                cidade_atual = match_cliente.group(5).strip()
-                                logger.info(f"Cliente encontrado: {codigo_cliente_atual} - {cliente_atual}")
-                                continue
-                        except Exception as e:
-                            logger.debug(f"Erro ao processar cliente na linha {linha_num}: {e}")
-
-                        # Tentar match com títulos BANC (bancário)
-                        try:
-                            match_banc = regex_titulo_banc.match(linha)
-                            if match_banc and cliente_atual:
-                                documento = match_banc.group(1)
-                                emissao = match_banc.group(2)
-                                vencimento = match_banc.group(3)
-                                ats = match_banc.group(4)
-                                tipo = match_banc.group(5)
-                                boleto = match_banc.group(6)
-                                valor_doc = match_banc.group(7)
-                                juros = match_banc.group(8)
-                                multa = match_banc.group(9)
-                                tarifa = match_banc.group(10)
-                                valor_total = match_banc.group(11)
-
-                                dados.append([
-                                    codigo_cliente_atual, cliente_atual, telefone_atual, cidade_atual, 
-                                    documento, emissao, vencimento, ats, tipo, boleto, 
-                                    valor_doc, juros, multa, tarifa, valor_total
-                                ])
-                                logger.info(f"Título BANC encontrado: {documento} - {cliente_atual}")
-                                continue
-                        except Exception as e:
-                            logger.debug(f"Erro ao processar título BANC na linha {linha_num}: {e}")
-
-                        # Tentar match com títulos CART (cartão)
-                        try:
-                            match_cart = regex_titulo_cart.match(linha)
-                            if match_cart and cliente_atual:
-                                documento = match_cart.group(1)
-                                emissao = match_cart.group(2)
-                                vencimento = match_cart.group(3)
-                                ats = match_cart.group(4)
-                                tipo = match_cart.group(5)
-                                boleto = ""  # CART não tem boleto
-                                valor_doc = match_cart.group(6)
-                                juros = match_cart.group(7)
-                                multa = match_cart.group(8)
-                                tarifa = match_cart.group(9)
-                                valor_total = match_cart.group(10)
-
-                                dados.append([
-                                    codigo_cliente_atual, cliente_atual, telefone_atual, cidade_atual, 
-                                    documento, emissao, vencimento, ats, tipo, boleto, 
-                                    valor_doc, juros, multa, tarifa, valor_total
-                                ])
-                                logger.info(f"Título CART encontrado: {documento} - {cliente_atual}")
-                                continue
-                        except Exception as e:
-                            logger.debug(f"Erro ao processar título CART na linha {linha_num}: {e}")
-                            
-                except Exception as e:
-                    logger.error(f"Erro ao processar página {page_num}: {e}")
+                    texto = textpage.get_text_range()
+                finally:
+                    textpage.close()
+            finally:
+                page.close()
+        return texto.replace("\r\n", "\n").replace("\r", "\n")
+
+    def hash(self, pagina):
+        return None
+
+    def liberar(self, pagina):
+        pass
+
+EXTRATORES = {extrator.nome: extrator for extrator in (ExtratorPdfplumber, ExtratorPdfium)}
+
+def abrir_pdf(fonte, backend=None):
+    """Abre o PDF com o backend de extração informado ou o configurado em PDF_BACKEND"""
+    if backend is None:
+        backend = app.config["PDF_BACKEND"]
+    try:
+        extrator = EXTRATORES[backend]
+    except KeyError:
+        raise Exception(f"Backend de extração desconhecido: {backend}")
+    return extrator(fonte)
+
+def _extrair_pagina(pdf, page_num):
+    """Extrai o texto de uma página e classifica suas linhas.
+
+    O resultado não depende das outras páginas, então pode ser reaproveitado do
+    cache por página sempre que o conteúdo da página for o mesmo.
+    """
+    page = pdf.pagina(page_num - 1)
+    cache = cache_paginas()
+    chave = None
+    if cache is not None:
+        try:
+            hash_conteudo = pdf.hash(page)
+            if hash_conteudo is not None:
+                chave = f"{hash_conteudo}.json"
+                resultado = cache.ler_json(chave)
+                if resultado is not None:
+                    contar("cache_paginas_hit")
+                    pdf.liberar(page)
+                    return resultado
+                contar("cache_paginas_miss")
+        except Exception as e:
+            logger.debug(f"Erro ao consultar cache da página {page_num}: {e}")
+
+    try:
+        with etapa("extrair_texto"):
+            texto = pdf.texto(page)
+        if not texto:
+            logger.warning(f"Página {page_num} não contém texto extraível")
+            resultado = [], [], None
+        else:
+            with etapa("classificar"):
+                resultado = parsear_pagina(texto, page_num)
+        if chave is not None:
+            cache.guardar_json(chave, resultado)
+        return resultado
+    except Exception as e:
+        logger.error(f"Erro ao processar página {page_num}: {e}")
+        return [], [], None
+    finally:
+        pdf.liberar(page)
+
+def _extrair_bloco(pdf_path, inicio, fim, backend):
+    """Extrai as páginas [inicio, fim) em um processo do pool.
+
+    Retorna os resultados das páginas e os tempos/contagens medidos no processo.
+    """
+    cronometro = Cronometro()
+    _cronometro.set(cronometro)
+    with cronometro.etapa("abrir_pdf"):
+        pdf = abrir_pdf(pdf_path, backend)
+    with pdf:
+        resultados = [_extrair_pagina(pdf, i + 1) for i in range(inicio, fim)]
+    return resultados, cronometro.etapas, cronometro.contagens
+
+def gerar_paginas(fonte, workers=None, progresso=None, backend=None, paginas=None):
+    """Gera os resultados de cada página em ordem, em paralelo quando workers > 1.
+
+    fonte pode ser um caminho ou um arquivo aberto (upload em memória). Se
+    informado, progresso(paginas_processadas, total_paginas) é chamado a cada página.
+    paginas limita a extração ao intervalo (primeira, ultima), numerado a partir
+    de 1 e com ultima None para ir até o fim; as demais páginas nem são lidas.
+    Quem parar de consumir o gerador interrompe a extração das páginas seguintes.
+    """
+    if workers is None:
+        workers = app.config["PDF_WORKERS"]
+    if backend is None:
+        backend = app.config["PDF_BACKEND"]
+
+    with etapa("abrir_pdf"):
+        pdf = abrir_pdf(fonte, backend)
+        total_paginas = len(pdf)
+
+    primeira, ultima = paginas or (1, None)
+    ultima = total_paginas if ultima is None else min(ultima, total_paginas)
+    total_intervalo = max(0, ultima - primeira + 1)
+
+    with pdf:
+        # Orçamento de páginas conferido antes de extrair qualquer página
+        admitir_paginas(total_intervalo)
+        if total_intervalo < total_paginas:
+            logger.info(f"Processando páginas {primeira} a {ultima} de {total_paginas} ({backend})")
+        else:
+            logger.info(f"Processando PDF com {total_paginas} páginas ({backend})")
+
+        if workers <= 1 or total_intervalo < 2:
+            for page_num in range(primeira, ultima + 1):
+                yield _extrair_pagina(pdf, page_num)
+                contar("paginas")
+                if progresso:
+                    progresso(page_num - primeira + 1, total_intervalo)
+            return
+
+    if isinstance(fonte, (str, os.PathLike)):
+        yield from _gerar_paginas_paralelo(fonte, primeira, ultima, workers, progresso, backend)
+        return
+
+    # Os processos do pool reabrem o PDF pelo caminho: só aqui o upload vai para o disco
+    with tempfile.NamedTemporaryFile(suffix=".pdf", dir=pasta_temporaria()) as copia:
+        fonte.seek(0)
+        shutil.copyfileobj(fonte, copia)
+        copia.flush()
+        yield from _gerar_paginas_paralelo(copia.name, primeira, ultima, workers, progresso, backend)
+
+# Teto de páginas por tarefa enviada ao pool
+PAGINAS_POR_BLOCO = 8
+
+def _gerar_paginas_paralelo(pdf_path, primeira, ultima, workers, progresso, backend):
+    # Vários blocos por worker para equilibrar páginas mais pesadas
+    total_paginas = ultima - primeira + 1
+    workers = min(workers, total_paginas)
+    # Blocos pequenos: a primeira página chega logo e uma parada antecipada desperdiça pouco
+    tamanho_bloco = max(1, min(PAGINAS_POR_BLOCO, -(-total_paginas // (workers * 4))))
+    logger.info(f"Extração paralela: {workers} processos, blocos de {tamanho_bloco} páginas")
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    concluido = False
+    try:
+        # Janela limitada de blocos em andamento para não acumular resultados na memória
+        pendentes = deque()
+        processadas = 0
+        for inicio in range(primeira - 1, ultima, tamanho_bloco):
+            fim = min(inicio + tamanho_bloco, ultima)
+            pendentes.append(pool.submit(_extrair_bloco, pdf_path, inicio, fim, backend))
+            while pendentes and (len(pendentes) >= workers * 2 or fim == ultima):
+                with etapa("aguardar_processos"):
+                    resultados, etapas, contagens = pendentes.popleft().result()
+                cronometro = _cronometro.get()
+                if cronometro is not None:
+                    cronometro.somar(etapas, contagens)
+                for resultado in resultados:
+                    yield resultado
+                    contar("paginas")
+                    processadas += 1
+                    if progresso:
+                        progresso(processadas, total_paginas)
+        concluido = True
+    finally:
+        # Consumo interrompido (filtro ou limite): blocos ainda não iniciados são
+        # cancelados e a resposta não espera os que já estão em andamento
+        pool.shutdown(wait=concluido, cancel_futures=True)
+
+def filtrar_registros(registros, cliente=None, limite=None):
+    """Filtra as linhas por código de cliente e/ou limita a quantidade.
+
+    Os títulos de um cliente ficam em um bloco contínuo do relatório, então
+    quando aparece outro cliente depois do procurado nenhuma linha seguinte
+    pode coincidir: o filtro para de consumir e a extração das páginas
+    restantes é interrompida. O mesmo vale ao atingir o limite de linhas.
+    """
+    if cliente is None and limite is None:
+        yield from registros
+        return
+    if limite is not None and limite <= 0:
+        return
+    encontradas = 0
+    visto = False
+    for linha in registros:
+        if cliente is not None:
+            if linha[0] != cliente:
+                if visto:
+                    logger.info(f"Bloco do cliente {cliente} encerrado: extração interrompida")
+                    return
+                continue
+            visto = True
+        yield linha
+        encontradas += 1
+        if limite is not None and encontradas >= limite:
+            logger.info(f"Limite de {limite} linhas atingido: extração interrompida")
+            return
+
+def espelhar_registros(registros, destino):
+    """Repassa as linhas entregando cada uma antes a destino.
+
+    destino recebe a linha bruta, antes de o escritor convertê-la no lugar, e
+    não deve alterá-la nem guardar a lista.
+    """
+    for linha in registros:
+        destino(linha)
+        yield linha
+
+def registros_pdf(fonte, workers=None, progresso=None, backend=None, paginas=None, cliente=None, limite=None,
+                  espelho=None):
+    """Linhas completas do PDF, já com o intervalo de páginas e os filtros aplicados.
+
+    espelho, se informado, recebe cada linha bruta (usado pelo índice).
+    """
+    resultados = gerar_paginas(fonte, workers, progresso, backend, paginas)
+    registros = filtrar_registros(combinar_paginas(resultados), cliente, limite)
+    if espelho is not None:
+        registros = espelhar_registros(registros, espelho)
+    return registros
+
+def extrair_registros(fonte, workers=None, progresso=None, backend=None, **filtros):
+    """Extrai os títulos do PDF para um BufferColunar, em paralelo quando workers > 1"""
+    dados = BufferColunar()
+    for linha in registros_pdf(fonte, workers, progresso, backend, **filtros):
+        dados.append(linha)
+    return dados
+
+def converter_linhas(registros):
+    """Converte valores e datas de cada linha (datas inválidas viram None)"""
+    for linha in registros:
+        for i in INDICES_NUMERICOS:
+            linha[i] = limpar_valor_numerico(linha[i])
+        for i in INDICES_DATAS:
+            linha[i] = converter_data(linha[i])
+        yield linha
+
+@contextmanager
+def _saida_texto(output_path):
+    """Abre a saída (caminho ou arquivo binário aberto) para escrita de texto UTF-8"""
+    if isinstance(output_path, (str, os.PathLike)):
+        with open(output_path, "w", encoding="utf-8", newline="") as destino:
+            yield destino
+        return
+    destino = TextIOWrapper(output_path, encoding="utf-8", newline="")
+    try:
+        yield destino
+    finally:
+        # Devolver o arquivo binário aberto para quem chamou
+        destino.flush()
+        destino.detach()
+
+def escrever_csv(registros, output_path):
+    """Grava as linhas em CSV conforme são extraídas (datas ISO, decimais com ponto)"""
+    total = 0
+    with _saida_texto(output_path) as destino:
+        escritor = csv.writer(destino)
+        escritor.writerow(COLUNAS)
+        for linha in converter_linhas(registros):
+            for i in INDICES_DATAS:
+                linha[i] = linha[i].date().isoformat() if linha[i] is not None else ""
+            escritor.writerow(linha)
+            total += 1
+    return total
+
+def escrever_jsonl(registros, output_path):
+    """Grava um objeto JSON por linha, com as mesmas chaves das colunas da planilha"""
+    total = 0
+    with _saida_texto(output_path) as destino:
+        for linha in converter_linhas(registros):
+            for i in INDICES_DATAS:
+                if linha[i] is not None:
+                    linha[i] = linha[i].date().isoformat()
+            destino.write(json.dumps(dict(zip(COLUNAS, linha)), ensure_ascii=False))
+            destino.write("\n")
+            total += 1
+    return total
+
+def escrever_xlsxwriter(registros, output_path):
+    """Grava o Excel com o xlsxwriter em modo constant_memory (linhas vão direto ao disco).
+
+    Ao contrário do openpyxl write-only, as larguras podem ser definidas depois
+    das linhas, então não há arquivo intermediário.
+    """
+    if xlsxwriter is None:
+        raise Exception("Formato xlsxwriter indisponível: instale o pacote XlsxWriter")
+    larguras = [len(col) for col in COLUNAS]
+    total = 0
+
+    wb = xlsxwriter.Workbook(output_path, {"constant_memory": True, "tmpdir": pasta_temporaria("saida")})
+    try:
+        worksheet = wb.add_worksheet("Pendências")
+        formato_data = wb.add_format({"num_format": FORMATO_DATA_EXCEL})
+        worksheet.write_row(0, 0, COLUNAS)
+        for linha in converter_linhas(registros):
+            total += 1
+            for i in INDICES_DATAS:
+                if linha[i] is not None:
+                    worksheet.write_datetime(total, i, linha[i], formato_data)
+                    if larguras[i] < LARGURA_DATA:
+                        larguras[i] = LARGURA_DATA
+            for i in INDICES_TEXTO:
+                valor = linha[i]
+                # Células vazias ficam em branco, como nos outros escritores
+                if valor is None or valor == "":
                     continue
+                worksheet.write(total, i, valor)
+                tamanho = len(str(valor))
+                if tamanho > larguras[i]:
+                    larguras[i] = tamanho
+        for i, largura in enumerate(larguras):
+            worksheet.set_column(i, i, min(largura + 2, LARGURA_MAXIMA))
+    finally:
+        wb.close()
+    return total
+
+def escrever_xlsx_streaming(registros, output_path):
+    """Grava as linhas em um Excel write-only sem manter a planilha na memória.
+
+    As larguras das colunas precisam ser gravadas antes da primeira linha, então
+    as linhas já convertidas passam primeiro por um arquivo temporário enquanto
+    as larguras são acumuladas; depois são regravadas no workbook.
+    """
+    larguras = [len(col) for col in COLUNAS]
+    total = 0
+
+    with tempfile.TemporaryFile(dir=pasta_temporaria("saida")) as spool:
+        for linha in converter_linhas(registros):
+            for i in INDICES_DATAS:
+                if linha[i] is not None and larguras[i] < LARGURA_DATA:
+                    larguras[i] = LARGURA_DATA
+            for i in INDICES_TEXTO:
+                valor = linha[i]
+                if valor is None:
+                    continue
+                tamanho = len(str(valor))
+                if tamanho > larguras[i]:
+                    larguras[i] = tamanho
+            pickle.dump(linha, spool, pickle.HIGHEST_PROTOCOL)
+            total += 1
+
+        if not total:
+            return 0
+
+        wb = Workbook(write_only=True)
+        worksheet = wb.create_sheet("Pendências")
+        for i, largura in enumerate(larguras):
+            worksheet.column_dimensions[get_column_letter(i + 1)].width = min(largura + 2, LARGURA_MAXIMA)
+
+        worksheet.append(COLUNAS)
+        spool.seek(0)
+        for _ in range(total):
+            linha = pickle.load(spool)
+            # Células vazias ficam em branco, como no caminho via DataFrame
+            linha = [valor if valor != "" else None for valor in linha]
+            for i in INDICES_DATAS:
+                if linha[i] is not None:
+                    linha[i] = WriteOnlyCell(worksheet, value=linha[i])
+                    linha[i].number_format = FORMATO_DATA_EXCEL
+            worksheet.append(linha)
+        wb.save(output_path)
+
+    return total
 
+def larguras_colunas(df):
+    """Largura de cada coluna: o texto mais longo entre cabeçalho e valores, com folga de 2"""
+    larguras = []
+    for nome in df.columns:
+        serie = df[nome]
+        if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+            tamanho = LARGURA_DATA if serie.notna().any() else 0
+        elif isinstance(serie.dtype, pd.CategoricalDtype):
+            # Cada valor distinto é medido uma única vez
+            tamanho = serie.cat.categories.astype(str).str.len().max()
+        elif pd.api.types.is_numeric_dtype(serie.dtype):
+            # str() nativo em lista é mais rápido que astype(str) para floats
+            tamanho = max(map(len, map(str, serie.dropna().tolist())), default=0)
+        else:
+            tamanho = serie.dropna().astype(str).str.len().max()
+        if pd.isna(tamanho):
+            tamanho = 0
+        larguras.append(min(max(len(str(nome)), int(tamanho)) + 2, LARGURA_MAXIMA))
+    return larguras
+
+def escrever_planilha(writer, df, nome):
+    """Grava o DataFrame como uma planilha formatada (datas e larguras)"""
+    df.to_excel(writer, index=False, sheet_name=nome)
+
+    # Exibir datas como dd/mm/aaaa (o writer openpyxl do pandas ignora date_format)
+    worksheet = writer.sheets[nome]
+    for col in COLUNAS_DATAS:
+        if col not in df.columns:
+            continue
+        column_letter = get_column_letter(df.columns.get_loc(col) + 1)
+        for cell in worksheet[column_letter][1:]:
+            cell.number_format = FORMATO_DATA_EXCEL
+
+    # Ajustar larguras das colunas a partir do DataFrame, sem percorrer as células
+    with etapa("larguras"):
+        for i, largura in enumerate(larguras_colunas(df)):
+            worksheet.column_dimensions[get_column_letter(i + 1)].width = largura
+
+# Formatos de saída: extensão, mimetype e, para os gravados linha a linha, o escritor.
+# Os demais (xlsx via openpyxl sem streaming e parquet) passam pelo DataFrame.
+FORMATOS_SAIDA = {
+    "xlsx": ("xlsx", MIMETYPE_XLSX, None),
+    "xlsxwriter": ("xlsx", MIMETYPE_XLSX, escrever_xlsxwriter),
+    "csv": ("csv", "text/csv", escrever_csv),
+    "jsonl": ("jsonl", "application/x-ndjson", escrever_jsonl),
+    "parquet": ("parquet", "application/vnd.apache.parquet", None),
+}
+
+class SemResultados(Exception):
+    """Os filtros (páginas, cliente, limite) são válidos mas nenhum título os atende"""
+
+def _erro_sem_dados(filtros):
+    # Com filtros, resultado vazio é uma resposta normal; sem eles, o PDF não tem o formato esperado
+    if any(valor is not None for valor in filtros.values()):
+        return SemResultados("Nenhum título encontrado com as páginas e filtros informados.")
+    return Exception("Nenhum dado foi extraído do PDF. Verifique se o formato está correto.")
+
+def processar_pdf(pdf_path, output_path, workers=None, streaming=None, progresso=None, backend=None,
+                  formato="xlsx", espelho=None, **filtros):
+    """Processa PDF e gera Excel (ou outro formato de FORMATOS_SAIDA) com tratamento de erros melhorado.
+
+    pdf_path e output_path podem ser caminhos ou arquivos abertos (ex.: BytesIO).
+    filtros são paginas, cliente e limite, como em registros_pdf; espelho recebe
+    cada linha extraída antes da conversão.
+    """
+    if streaming is None:
+        streaming = app.config["XLSX_STREAMING"]
+    extensao, _, escritor = FORMATOS_SAIDA[formato]
+    nome_etapa = "excel" if extensao == "xlsx" else "escrita"
+    if formato == "xlsx" and streaming:
+        escritor = escrever_xlsx_streaming
+
+    if escritor is not None:
+        try:
+            registros = registros_pdf(pdf_path, workers, progresso, backend, espelho=espelho, **filtros)
+            # A extração acontece dentro da escrita, mas é medida nas próprias etapas
+            with etapa(nome_etapa):
+                total = escritor(registros, output_path)
+        except LimiteExcedido:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao processar PDF em streaming: {e}")
+            raise Exception(f"Erro ao processar PDF: {str(e)}")
+        if not total:
+            raise _erro_sem_dados(filtros)
+        contar("linhas", total)
+        logger.info(f"Arquivo {formato} salvo em: {output_path}")
+        return total
+
+    try:
+        dados = extrair_registros(pdf_path, workers, progresso, backend, espelho=espelho, **filtros)
+    except LimiteExcedido:
+        raise
     except Exception as e:
         logger.error(f"Erro ao abrir PDF: {e}")
         raise Exception(f"Erro ao processar PDF: {str(e)}")
 
     if not dados:
-        raise Exception("Nenhum dado foi extraído do PDF. Verifique se o formato está correto.")
+        raise _erro_sem_dados(filtros)
 
-    # Criar DataFrame com colunas ajustadas
-    colunas = [
-        "Código Cliente", "Cliente", "Telefone", "Cidade", "Documento", "Emissão", 
-        "Vencimento", "ATS", "Tipo", "Boleto", "Valor Documento", "Juros", "Multa", "Tarifa", "Valor Total"
-    ]
-    
+    # Criar DataFrame com colunas ajustadas (valores e datas já convertidos no buffer)
     try:
-        df = pd.DataFrame(dados, columns=colunas)
+        df = dados.para_dataframe()
         logger.info(f"DataFrame criado com {len(df)} registros")
 
-        # Ajustar valores numéricos com tratamento de erro
-        colunas_numericas = ["Valor Documento", "Juros", "Multa", "Tarifa", "Valor Total"]
-        for col in colunas_numericas:
-            if col in df.columns:
-                df[col] = df[col].apply(limpar_valor_numerico)
+        if formato == "parquet":
+            # Colunas tipadas: floats, datas e categorias viram colunas de dicionário
+            with etapa(nome_etapa):
+                df.to_parquet(output_path, index=False)
+        else:
+            # Salvar Excel com formatação melhorada
+            with etapa(nome_etapa), pd.ExcelWriter(output_path, engine="openpyxl") as writer:
+                escrever_planilha(writer, df, "Pendências")
 
-        # Salvar Excel com formatação melhorada
-        with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Pendências")
-            
-            # Ajustar larguras das colunas
-            worksheet = writer.sheets["Pendências"]
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-            
-        logger.info(f"Excel salvo em: {output_path}")
+        contar("linhas", len(dados))
+        logger.info(f"Arquivo {formato} salvo em: {output_path}")
         return len(dados)
         
     except Exception as e:
         logger.error(f"Erro ao criar DataFrame ou salvar Excel: {e}")
         raise Exception(f"Erro ao processar dados: {str(e)}")
 
+class CacheDisco:
+    """Cache de arquivos em disco com expiração (TTL) e descarte LRU por tamanho.
+
+    O mtime de cada entrada marca a criação (TTL) e o atime o último acesso (LRU).
+    """
+
+    def __init__(self, pasta, max_bytes, ttl, intervalo_descarte=0):
+        self.pasta = pasta
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # Segundos mínimos entre varreduras da pasta ao gravar
+        self.intervalo_descarte = intervalo_descarte
+        self._ultimo_descarte = 0.0
+
+    def _caminho(self, chave):
+        return os.path.join(self.pasta, chave)
+
+    def abrir(self, chave):
+        """Abre a entrada para leitura, ou retorna None se ausente/expirada"""
+        caminho = self._caminho(chave)
+        try:
+            mtime = os.path.getmtime(caminho)
+            if time.time() - mtime > self.ttl:
+                os.remove(caminho)
+                return None
+            arquivo = open(caminho, "rb")
+            os.utime(caminho, (time.time(), mtime))
+            return arquivo
+        except OSError:
+            return None
+
+    def ler_json(self, chave):
+        arquivo = self.abrir(chave)
+        if arquivo is None:
+            return None
+        with arquivo:
+            try:
+                return json.load(arquivo)
+            except ValueError:
+                return None
+
+    def _gravar(self, chave, escrever):
+        try:
+            os.makedirs(self.pasta, exist_ok=True)
+            caminho = self._caminho(chave)
+            temporario = f"{caminho}.{uuid.uuid4().hex}.tmp"
+            escrever(temporario)
+            os.replace(temporario, caminho)
+            if time.time() - self._ultimo_descarte >= self.intervalo_descarte:
+                self.descartar()
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Erro ao gravar no cache: {e}")
+
+    def guardar(self, chave, origem):
+        """Copia o arquivo origem para o cache e aplica os limites"""
+        self._gravar(chave, lambda destino: shutil.copyfile(origem, destino))
+
+    def guardar_bytes(self, chave, dados):
+        def escrever(destino):
+            with open(destino, "wb") as f:
+                f.write(dados)
+        self._gravar(chave, escrever)
+
+    def guardar_json(self, chave, valor):
+        def escrever(destino):
+            with open(destino, "w", encoding="utf-8") as f:
+                json.dump(valor, f, ensure_ascii=False)
+        self._gravar(chave, escrever)
+
+    def descartar(self):
+        """Remove entradas expiradas e as menos usadas até caber em max_bytes"""
+        agora = time.time()
+        self._ultimo_descarte = agora
+        entradas = []
+        total = 0
+        try:
+            nomes = os.listdir(self.pasta)
+        except OSError:
+            return
+        for nome in nomes:
+            caminho = os.path.join(self.pasta, nome)
+            try:
+                info = os.stat(caminho)
+                if not stat.S_ISREG(info.st_mode):
+                    continue
+                if agora - info.st_mtime > self.ttl:
+                    os.remove(caminho)
+                    continue
+            except OSError:
+                continue
+            entradas.append((info.st_atime, info.st_size, caminho))
+            total += info.st_size
+
+        entradas.sort()
+        for _, tamanho, caminho in entradas:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(caminho)
+                total -= tamanho
+            except OSError:
+                pass
+
+_cache_resultados = None
+
+def cache_resultados():
+    global _cache_resultados
+    if _cache_resultados is None:
+        _cache_resultados = CacheDisco(app.config["CACHE_FOLDER"], app.config["CACHE_MAX_BYTES"],
+                                       app.config["CACHE_TTL"])
+    return _cache_resultados
+
+_cache_paginas = None
+
+def cache_paginas():
+    """Cache por página, ou None se desativado"""
+    global _cache_paginas
+    if not app.config["PAGE_CACHE_ENABLED"]:
+        return None
+    if _cache_paginas is None:
+        _cache_paginas = CacheDisco(app.config["PAGE_CACHE_FOLDER"], app.config["PAGE_CACHE_MAX_BYTES"],
+                                    app.config["PAGE_CACHE_TTL"], intervalo_descarte=30)
+    return _cache_paginas
+
+# Colunas da tabela titulos do índice, na ordem de COLUNAS
+CAMPOS_INDICE = [
+    "codigo_cliente", "cliente", "telefone", "cidade", "documento", "emissao",
+    "vencimento", "ats", "tipo", "boleto", "valor_documento", "juros", "multa", "tarifa", "valor_total"
+]
+# Incrementar ao mudar o esquema: o índice antigo é descartado e reconstruído
+VERSAO_INDICE = 3
+
+class IndiceRelatorios:
+    """Relatórios convertidos gravados em SQLite, com índices por cliente, vencimento e tipo.
+
+    Cada relatório é identificado por chave_relatorio (PDF + versão do parser +
+    backend). Datas ficam como texto ISO (aaaa-mm-dd), que ordena e compara
+    corretamente. Cada operação abre a própria conexão, então o índice pode ser
+    usado por várias threads e pelos workers do gunicorn ao mesmo tempo.
+    """
+
+    # Segundos até uma gravação sem conclusão ser considerada abandonada
+    VALIDADE_GRAVACAO = 24 * 3600
+
+    def __init__(self, caminho, max_relatorios):
+        self.caminho = caminho
+        self.max_relatorios = max_relatorios
+        self._esquema_criado = False
+
+    def _conectar(self):
+        pasta = os.path.dirname(self.caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        conexao.row_factory = sqlite3.Row
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        if not self._esquema_criado:
+            self._criar_esquema(conexao)
+            self._esquema_criado = True
+        return conexao
+
+    def _criar_esquema(self, conexao):
+        # WAL: consultas não esperam a gravação de um relatório novo
+        conexao.execute("PRAGMA journal_mode=WAL")
+        if conexao.execute("PRAGMA user_version").fetchone()[0] != VERSAO_INDICE:
+            with conexao:
+                conexao.execute("DROP TABLE IF EXISTS titulos")
+                conexao.execute("DROP TABLE IF EXISTS relatorios")
+                conexao.execute("DROP TABLE IF EXISTS gravacoes")
+                conexao.execute(f"PRAGMA user_version={VERSAO_INDICE}")
+        with conexao:
+            conexao.execute("""CREATE TABLE IF NOT EXISTS relatorios (
+                id TEXT PRIMARY KEY, sha256 TEXT NOT NULL, arquivo TEXT,
+                indexado_em REAL NOT NULL, linhas INTEGER NOT NULL, paginas INTEGER)""")
+            # Gravações em andamento: linhas ainda sob um id provisório
+            conexao.execute("CREATE TABLE IF NOT EXISTS gravacoes (id TEXT PRIMARY KEY, iniciada_em REAL NOT NULL)")
+            colunas = ", ".join(f"{campo} REAL" if campo in CAMPOS_INDICE[10:] else f"{campo} TEXT"
+                                for campo in CAMPOS_INDICE)
+            conexao.execute(f"CREATE TABLE IF NOT EXISTS titulos (relatorio TEXT NOT NULL, {colunas})")
+            conexao.execute("CREATE INDEX IF NOT EXISTS titulos_cliente ON titulos (relatorio, codigo_cliente)")
+            conexao.execute("CREATE INDEX IF NOT EXISTS titulos_vencimento ON titulos (relatorio, vencimento)")
+            conexao.execute("CREATE INDEX IF NOT EXISTS titulos_tipo ON titulos (relatorio, tipo, vencimento)")
+
+    def contem(self, relatorio):
+        with closing(self._conectar()) as conexao:
+            return conexao.execute("SELECT 1 FROM relatorios WHERE id = ?", (relatorio,)).fetchone() is not None
+
+    def iniciar_gravacao(self, relatorio, sha256_pdf, arquivo):
+        """Gravação de um relatório alimentada linha a linha durante a conversão"""
+        return GravacaoIndice(self, relatorio, sha256_pdf, arquivo)
+
+    def _descartar_antigos(self, conexao):
+        """Relatórios além do limite e gravações abandonadas (processo encerrado no meio)"""
+        antigos = [linha[0] for linha in conexao.execute(
+            "SELECT id FROM relatorios ORDER BY indexado_em DESC LIMIT -1 OFFSET ?", (self.max_relatorios,))]
+        for antigo in antigos:
+            conexao.execute("DELETE FROM titulos WHERE relatorio = ?", (antigo,))
+            conexao.execute("DELETE FROM relatorios WHERE id = ?", (antigo,))
+        abandonadas = [linha[0] for linha in conexao.execute(
+            "SELECT id FROM gravacoes WHERE iniciada_em < ?", (time.time() - self.VALIDADE_GRAVACAO,))]
+        for abandonada in abandonadas:
+            conexao.execute("DELETE FROM titulos WHERE relatorio = ?", (abandonada,))
+            conexao.execute("DELETE FROM gravacoes WHERE id = ?", (abandonada,))
+
+    def relatorios(self):
+        """Relatórios indexados, do mais recente para o mais antigo"""
+        with closing(self._conectar()) as conexao:
+            return [dict(linha) for linha in conexao.execute("SELECT * FROM relatorios ORDER BY indexado_em DESC")]
+
+    def relatorio(self, relatorio=None):
+        """Dados do relatório pedido (ou do mais recente), ou None se não indexado"""
+        with closing(self._conectar()) as conexao:
+            if relatorio is None:
+                linha = conexao.execute("SELECT * FROM relatorios ORDER BY indexado_em DESC LIMIT 1").fetchone()
+            else:
+                linha = conexao.execute("SELECT * FROM relatorios WHERE id = ?", (relatorio,)).fetchone()
+            return dict(linha) if linha else None
+
+    def consultar(self, relatorio, cliente=None, tipo=None, vencimento_de=None, vencimento_ate=None, limite=None):
+        """Títulos do relatório que atendem aos critérios, com total e soma dos valores.
+
+        Retorna (titulos, total, soma): titulos vem ordenado como no PDF e limitado
+        a limite; total e soma ("Valor Total") consideram todos os títulos encontrados.
+        """
+        condicoes = ["relatorio = ?"]
+        parametros = [relatorio]
+        for condicao, valor in (("codigo_cliente = ?", cliente), ("tipo = ?", tipo),
+                                ("vencimento >= ?", vencimento_de), ("vencimento <= ?", vencimento_ate)):
+            if valor is not None:
+                condicoes.append(condicao)
+                parametros.append(valor)
+        where = " AND ".join(condicoes)
+        with closing(self._conectar()) as conexao:
+            total, soma = conexao.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(valor_total), 0) FROM titulos WHERE {where}", parametros).fetchone()
+            consulta = f"SELECT {', '.join(CAMPOS_INDICE)} FROM titulos WHERE {where} ORDER BY rowid"
+            if limite is not None:
+                consulta += f" LIMIT {int(limite)}"
+            titulos = [tuple(linha) for linha in conexao.execute(consulta, parametros)]
+        return titulos, total, soma
+
+class GravacaoIndice:
+    """Linhas de um relatório gravadas no índice em lotes, à medida que a conversão avança.
+
+    As linhas ficam sob um id provisório, em transações curtas que não seguram
+    o índice durante a conversão inteira; concluir() as passa para o id do
+    relatório de uma vez, e cancelar() as descarta. Só um lote fica na memória.
+    """
+
+    TAMANHO_LOTE = 2000
+
+    def __init__(self, indice, relatorio, sha256_pdf, arquivo):
+        self.indice = indice
+        self.relatorio = relatorio
+        self.sha256_pdf = sha256_pdf
+        self.arquivo = arquivo
+        self.provisorio = f"{relatorio}~{uuid.uuid4().hex}"
+        self.total = 0
+        self.ativa = True
+        self._lote = []
+        self._conexao = indice._conectar()
+        with self._conexao:
+            self._conexao.execute("INSERT INTO gravacoes VALUES (?, ?)", (self.provisorio, time.time()))
+
+    def adicionar(self, linha):
+        """Recebe uma linha bruta da extração (sem alterá-la)"""
+        convertida = list(linha)
+        for i in INDICES_NUMERICOS:
+            convertida[i] = limpar_valor_numerico(convertida[i])
+        for i in INDICES_DATAS:
+            data = converter_data(convertida[i])
+            convertida[i] = data.date().isoformat() if data is not None else None
+        self._lote.append((self.provisorio, *convertida))
+        if len(self._lote) >= self.TAMANHO_LOTE:
+            self._gravar_lote()
+
+    def _gravar_lote(self):
+        if not self._lote:
+            return
+        marcadores = ", ".join("?" * (len(CAMPOS_INDICE) + 1))
+        with etapa("indexar"), self._conexao:
+            self._conexao.executemany(f"INSERT INTO titulos VALUES ({marcadores})", self._lote)
+        self.total += len(self._lote)
+        self._lote = []
+
+    def concluir(self, paginas=None):
+        """Substitui a versão anterior do relatório pelas linhas gravadas (None se cancelada)"""
+        if not self.ativa:
+            return None
+        self.ativa = False
+        try:
+            self._gravar_lote()
+            with etapa("indexar"), self._conexao:
+                self._conexao.execute("DELETE FROM titulos WHERE relatorio = ?", (self.relatorio,))
+                self._conexao.execute("UPDATE titulos SET relatorio = ? WHERE relatorio = ?",
+                                      (self.relatorio, self.provisorio))
+                self._conexao.execute("DELETE FROM gravacoes WHERE id = ?", (self.provisorio,))
+                self._conexao.execute("INSERT OR REPLACE INTO relatorios VALUES (?, ?, ?, ?, ?, ?)",
+                                      (self.relatorio, self.sha256_pdf, self.arquivo, time.time(), self.total,
+                                       paginas))
+                self.indice._descartar_antigos(self._conexao)
+        finally:
+            self._conexao.close()
+        logger.info(f"Relatório {self.relatorio[:12]} indexado: {self.total} títulos")
+        return self.total
+
+    def cancelar(self):
+        if not self.ativa:
+            return
+        self.ativa = False
+        try:
+            with self._conexao:
+                self._conexao.execute("DELETE FROM titulos WHERE relatorio = ?", (self.provisorio,))
+                self._conexao.execute("DELETE FROM gravacoes WHERE id = ?", (self.provisorio,))
+        finally:
+            self._conexao.close()
+
+_indice_relatorios = None
+
+def indice_relatorios():
+    """Índice SQLite dos relatórios, ou None se desativado"""
+    global _indice_relatorios
+    if not app.config["INDEX_ENABLED"]:
+        return None
+    if _indice_relatorios is None:
+        _indice_relatorios = IndiceRelatorios(app.config["INDEX_PATH"], app.config["INDEX_MAX_REPORTS"])
+    return _indice_relatorios
+
+class EspacoInsuficiente(Exception):
+    """Não há espaço de rascunho para mais um envio"""
+
+class EspacoTemporario:
+    """Pastas de rascunho por requisição com limite total de bytes, compartilhado entre processos.
+
+    Cada área é uma subpasta "<pid>-<id>-<reserva>" da pasta raiz. A reserva
+    (bytes estimados para o envio) conta no uso total até a área ser liberada,
+    inclusive arquivos anônimos (spool do upload, cópias temporárias) que não
+    aparecem na listagem. Áreas de processos que morreram ou mais antigas que o
+    TTL são removidas pela varredura periódica.
+    """
+
+    def __init__(self, pasta, max_bytes, ttl, intervalo_varredura=60):
+        self.pasta = pasta
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.intervalo_varredura = intervalo_varredura
+        self._ultima_varredura = 0.0
+
+    @staticmethod
+    def _bytes_pasta(caminho):
+        total = 0
+        for raiz, _, arquivos in os.walk(caminho):
+            for nome in arquivos:
+                try:
+                    total += os.lstat(os.path.join(raiz, nome)).st_size
+                except OSError:
+                    pass
+        return total
+
+    def _areas(self):
+        """(caminho, pid, reserva) de cada área existente"""
+        try:
+            nomes = os.listdir(self.pasta)
+        except OSError:
+            return []
+        areas = []
+        for nome in nomes:
+            partes = nome.split("-")
+            if len(partes) == 3 and partes[0].isdecimal() and partes[2].isdecimal():
+                areas.append((os.path.join(self.pasta, nome), int(partes[0]), int(partes[2])))
+        return areas
+
+    def uso(self):
+        """Bytes ocupados (ou reservados) por todas as áreas"""
+        return sum(max(reserva, self._bytes_pasta(caminho)) for caminho, _, reserva in self._areas())
+
+    @staticmethod
+    def _processo_vivo(pid):
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass
+        return True
+
+    def varrer(self, forcar=False):
+        """Remove áreas esquecidas por processos encerrados ou mais antigas que o TTL"""
+        agora = time.time()
+        if not forcar and agora - self._ultima_varredura < self.intervalo_varredura:
+            return 0
+        self._ultima_varredura = agora
+        removidas = 0
+        for caminho, pid, _ in self._areas():
+            try:
+                expirada = agora - os.path.getmtime(caminho) > self.ttl
+            except OSError:
+                continue
+            if expirada or not self._processo_vivo(pid):
+                shutil.rmtree(caminho, ignore_errors=True)
+                removidas += 1
+        if removidas:
+            logger.info(f"Rascunho: {removidas} áreas abandonadas removidas")
+        return removidas
+
+    def criar_area(self, reserva):
+        """Cria uma área reservando bytes; levanta EspacoInsuficiente se o limite estourar"""
+        self.varrer()
+        os.makedirs(self.pasta, exist_ok=True)
+        caminho = os.path.join(self.pasta, f"{os.getpid()}-{uuid.uuid4().hex}-{int(reserva)}")
+        os.mkdir(caminho)
+        # A área já existe ao medir: dois processos admitindo ao mesmo tempo veem um ao outro
+        uso = self.uso()
+        livre = shutil.disk_usage(self.pasta).free
+        if uso > self.max_bytes or livre < reserva:
+            self.liberar_area(caminho)
+            metricas.incrementar("conversor_rascunho_rejeicoes_total")
+            logger.warning(f"Rascunho sem espaço: {uso} de {self.max_bytes} bytes em uso, "
+                           f"{livre} livres no disco, {reserva} pedidos")
+            raise EspacoInsuficiente("Servidor sem espaço temporário no momento. Tente novamente em instantes.")
+        return caminho
+
+    def liberar_area(self, caminho):
+        shutil.rmtree(caminho, ignore_errors=True)
+
+    @contextmanager
+    def usar_area(self, caminho):
+        """Torna a área a pasta temporária do contexto atual (ver pasta_temporaria) e a remove na saída"""
+        token = _area_temporaria.set(caminho)
+        try:
+            yield caminho
+        finally:
+            _area_temporaria.reset(token)
+            self.liberar_area(caminho)
+
+# Área de rascunho da requisição ou job em andamento no contexto atual
+_area_temporaria = contextvars.ContextVar("area_temporaria", default=None)
+
+_espaco_temporario = None
+
+def espaco_temporario():
+    global _espaco_temporario
+    if _espaco_temporario is None:
+        _espaco_temporario = EspacoTemporario(app.config["SCRATCH_FOLDER"], app.config["SCRATCH_MAX_BYTES"],
+                                              app.config["SCRATCH_TTL"])
+    return _espaco_temporario
+
+def pasta_temporaria(tipo="upload"):
+    """Pasta para arquivos temporários: a área atual ou, fora dela, UPLOAD_FOLDER/OUTPUT_FOLDER"""
+    area = _area_temporaria.get()
+    if area is not None:
+        return area
+    return app.config["OUTPUT_FOLDER"] if tipo == "saida" else app.config["UPLOAD_FOLDER"]
+
+# Upload, cópia do PDF para o pool paralelo e arquivos intermediários da saída
+FATOR_RESERVA = 3
+
+def com_area_temporaria(view):
+    """Executa a view (POST) dentro de uma área de rascunho do tamanho do envio.
+
+    Recusa com 507 antes de ler o corpo se não houver espaço; a área é
+    removida ao fim da view, com ou sem erro.
+    """
+    @functools.wraps(view)
+    def envolvida(*args, **kwargs):
+        if request.method != "POST":
+            return view(*args, **kwargs)
+        tamanho = request.content_length or app.config["MAX_CONTENT_LENGTH"]
+        espaco = espaco_temporario()
+        try:
+            caminho = espaco.criar_area(tamanho * FATOR_RESERVA)
+        except EspacoInsuficiente as e:
+            response = jsonify({"error": str(e)})
+            response.headers["Retry-After"] = "30"
+            return response, 507
+        with espaco.usar_area(caminho):
+            return view(*args, **kwargs)
+    return envolvida
+
+class LimiteExcedido(Exception):
+    """Requisição recusada pelo controle de admissão, respondida com status e Retry-After"""
+
+    def __init__(self, mensagem, status, motivo, retry_after=None):
+        super().__init__(mensagem)
+        self.status = status
+        self.motivo = motivo
+        self.retry_after = retry_after
+
+    def __reduce__(self):
+        # Pickle padrão de exceções repassa só args ao __init__: sem isso a
+        # exceção não volta de um processo do pool
+        return type(self), (str(self), self.status, self.motivo, self.retry_after)
+
+def resposta_limite(erro):
+    metricas.incrementar("conversor_admissao_rejeicoes_total", motivo=erro.motivo)
+    logger.warning(f"Requisição recusada ({erro.motivo}): {erro}")
+    response = jsonify({"error": str(erro)})
+    if erro.retry_after is not None:
+        response.headers["Retry-After"] = str(max(1, math.ceil(erro.retry_after)))
+    return response, erro.status
+
+class VagasConversao:
+    """Limite de conversões simultâneas somando todos os processos do servidor.
+
+    Cada vaga é um arquivo de lock na pasta; ocupar uma vaga é conseguir o
+    flock exclusivo de um deles. O sistema libera o lock se o processo morrer,
+    então uma vaga nunca fica presa por um worker reiniciado.
+    """
+
+    def __init__(self, pasta, total):
+        self.pasta = pasta
+        self.total = total
+        self._semaforo = threading.BoundedSemaphore(total) if fcntl is None else None
+
+    def _tentar(self):
+        if self._semaforo is not None:
+            return self._semaforo if self._semaforo.acquire(blocking=False) else None
+        os.makedirs(self.pasta, exist_ok=True)
+        for numero in range(self.total):
+            arquivo = open(os.path.join(self.pasta, f"vaga-{numero}.lock"), "a")
+            try:
+                fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return arquivo
+            except OSError:
+                arquivo.close()
+        return None
+
+    def ocupar(self, espera=0):
+        """Ocupa uma vaga, esperando até espera segundos; retorna a vaga ou None"""
+        limite = time.monotonic() + espera
+        while True:
+            vaga = self._tentar()
+            if vaga is not None or time.monotonic() >= limite:
+                return vaga
+            time.sleep(0.05)
+
+    def liberar(self, vaga):
+        if vaga is self._semaforo:
+            self._semaforo.release()
+        else:
+            # Fechar o arquivo solta o flock
+            vaga.close()
+
+class LimitadorTaxa:
+    """Token bucket por cliente: rajada de até `rajada` requisições, repostas a `por_minuto`.
+
+    Os baldes ficam na memória do processo; com vários workers do gunicorn o
+    limite efetivo de um cliente é multiplicado pelo número de workers.
+    """
+
+    MAX_CLIENTES = 10000
+
+    def __init__(self, por_minuto, rajada):
+        self.por_segundo = por_minuto / 60
+        self.rajada = max(1, rajada)
+        self._baldes = {}
+        self._lock = threading.Lock()
+
+    def consumir(self, cliente):
+        """Consome uma ficha; retorna 0 se permitido ou os segundos até a próxima ficha"""
+        agora = time.monotonic()
+        with self._lock:
+            fichas, ultimo = self._baldes.get(cliente, (self.rajada, agora))
+            fichas = min(self.rajada, fichas + (agora - ultimo) * self.por_segundo)
+            if fichas < 1:
+                self._baldes[cliente] = (fichas, agora)
+                return (1 - fichas) / self.por_segundo
+            self._baldes[cliente] = (fichas - 1, agora)
+            if len(self._baldes) > self.MAX_CLIENTES:
+                self._descartar_cheios(agora)
+            return 0
+
+    def _descartar_cheios(self, agora):
+        # Baldes que já se encheram de novo equivalem a clientes nunca vistos
+        for cliente, (fichas, ultimo) in list(self._baldes.items()):
+            if fichas + (agora - ultimo) * self.por_segundo >= self.rajada:
+                del self._baldes[cliente]
+
+class OrcamentoPaginas:
+    """Total de páginas em extração nas conversões síncronas deste processo"""
+
+    def __init__(self, total):
+        self.total = total
+        self.em_uso = 0
+        self._lock = threading.Lock()
+
+    def reservar(self, paginas):
+        with self._lock:
+            if self.em_uso + paginas > self.total:
+                return False
+            self.em_uso += paginas
+            return True
+
+    def liberar(self, paginas):
+        with self._lock:
+            self.em_uso -= paginas
+
+_vagas_conversao = None
+_limitador_taxa = None
+_orcamento_paginas = None
+_lock_admissao = threading.Lock()
+# Conversões síncronas em andamento neste processo
+_conversoes_ativas = 0
+# Páginas reservadas pela requisição atual (None fora do controle de admissão)
+_paginas_reservadas = contextvars.ContextVar("paginas_reservadas", default=None)
+# Vaga de conversão da requisição atual: lista vazia até a conversão começar,
+# depois [vaga] (None fora do controle de admissão)
+_vaga_requisicao = contextvars.ContextVar("vaga_requisicao", default=None)
+
+def vagas_conversao():
+    """Vagas de conversão simultânea, ou None se ilimitado"""
+    global _vagas_conversao
+    if app.config["MAX_CONCURRENT_CONVERSIONS"] <= 0:
+        return None
+    if _vagas_conversao is None:
+        _vagas_conversao = VagasConversao(app.config["ADMISSION_FOLDER"], app.config["MAX_CONCURRENT_CONVERSIONS"])
+    return _vagas_conversao
+
+def limitador_taxa():
+    """Limitador por IP, ou None se desativado"""
+    global _limitador_taxa
+    if app.config["RATE_LIMIT_PER_MINUTE"] <= 0:
+        return None
+    if _limitador_taxa is None:
+        _limitador_taxa = LimitadorTaxa(app.config["RATE_LIMIT_PER_MINUTE"], app.config["RATE_LIMIT_BURST"])
+    return _limitador_taxa
+
+def orcamento_paginas():
+    """Orçamento de páginas do processo, ou None se ilimitado"""
+    global _orcamento_paginas
+    if app.config["PAGE_BUDGET"] <= 0:
+        return None
+    if _orcamento_paginas is None:
+        _orcamento_paginas = OrcamentoPaginas(app.config["PAGE_BUDGET"])
+    return _orcamento_paginas
+
+def admitir_paginas(quantidade):
+    """Reserva as páginas de um PDF recém-aberto no orçamento, antes da extração.
+
+    Só tem efeito dentro de uma requisição com controle de admissão; a reserva
+    é devolvida ao fim da requisição. Levanta LimiteExcedido (413 se o PDF não
+    cabe no orçamento inteiro, 503 se não cabe agora).
+    """
+    reservadas = _paginas_reservadas.get()
+    orcamento = orcamento_paginas()
+    if reservadas is None or orcamento is None:
+        return
+    if quantidade > orcamento.total:
+        raise LimiteExcedido(f"PDF com {quantidade} páginas; o máximo por conversão é {orcamento.total}. "
+                             f"Use o parâmetro paginas para converter por partes.", 413, "paginas_documento")
+    if not orcamento.reservar(quantidade):
+        raise LimiteExcedido("Servidor ocupado com outras conversões. Tente novamente em instantes.", 503,
+                             "orcamento_paginas", app.config["BUSY_RETRY_AFTER"])
+    reservadas.append(quantidade)
+
+def ocupar_vaga_conversao():
+    """Ocupa a vaga de conversão da requisição atual quando a conversão vai de fato rodar.
+
+    Chamada depois da consulta ao cache de resultados, para que respostas já
+    prontas não disputem vaga. Só tem efeito dentro de uma requisição com
+    controle de admissão, uma vez por requisição; a vaga é devolvida ao fim
+    dela. Levanta LimiteExcedido (503) se não houver vaga.
+    """
+    global _conversoes_ativas
+    ocupada = _vaga_requisicao.get()
+    if ocupada is None or ocupada:
+        return
+    vagas = vagas_conversao()
+    vaga = None
+    if vagas is not None:
+        vaga = vagas.ocupar(app.config["ADMISSION_WAIT"])
+        if vaga is None:
+            raise LimiteExcedido("Servidor ocupado com outras conversões. Tente novamente em instantes.", 503,
+                                 "vagas", app.config["BUSY_RETRY_AFTER"])
+    ocupada.append(vaga)
+    with _lock_admissao:
+        _conversoes_ativas += 1
+
+def liberar_paginas(quantidade):
+    """Devolve ao orçamento, antes do fim da requisição, uma reserva feita por admitir_paginas"""
+    reservadas = _paginas_reservadas.get()
+    if not reservadas or quantidade not in reservadas:
+        return
+    reservadas.remove(quantidade)
+    orcamento_paginas().liberar(quantidade)
+
+def com_admissao(conversao=True):
+    """Controle de admissão dos POSTs: taxa por IP e, se conversao, vaga e orçamento de páginas.
+
+    A taxa é conferida antes de ler o corpo da requisição (429 com Retry-After).
+    A vaga de conversão só é ocupada por ocupar_vaga_conversao, depois de uma
+    falta no cache; vaga e páginas reservadas são devolvidas ao fim da requisição.
+    """
+    def decorador(view):
+        @functools.wraps(view)
+        def envolvida(*args, **kwargs):
+            global _conversoes_ativas
+            if request.method != "POST":
+                return view(*args, **kwargs)
+            limitador = limitador_taxa()
+            if limitador is not None:
+                espera = limitador.consumir(request.remote_addr or "desconhecido")
+                if espera:
+                    return resposta_limite(LimiteExcedido(
+                        "Muitas requisições deste endereço. Tente novamente mais tarde.", 429, "taxa", espera))
+            if not conversao:
+                return view(*args, **kwargs)
+
+            token = _paginas_reservadas.set([])
+            token_vaga = _vaga_requisicao.set([])
+            try:
+                return view(*args, **kwargs)
+            finally:
+                reservadas = _paginas_reservadas.get()
+                ocupada = _vaga_requisicao.get()
+                _paginas_reservadas.reset(token)
+                _vaga_requisicao.reset(token_vaga)
+                if reservadas:
+                    orcamento_paginas().liberar(sum(reservadas))
+                if ocupada:
+                    with _lock_admissao:
+                        _conversoes_ativas -= 1
+                    if ocupada[0] is not None:
+                        vagas_conversao().liberar(ocupada[0])
+        return envolvida
+    return decorador
+
+def salvar_upload(file, filepath):
+    """Salva o upload em disco calculando o SHA-256 do conteúdo"""
+    sha256 = hashlib.sha256()
+    with open(filepath, "wb") as destino:
+        while True:
+            bloco = file.stream.read(64 * 1024)
+            if not bloco:
+                break
+            sha256.update(bloco)
+            destino.write(bloco)
+    return sha256.hexdigest()
+
+def hash_upload(stream):
+    """SHA-256 do upload, lido no próprio stream e rebobinado para a conversão"""
+    sha256 = hashlib.sha256()
+    while True:
+        bloco = stream.read(64 * 1024)
+        if not bloco:
+            break
+        sha256.update(bloco)
+    stream.seek(0)
+    return sha256.hexdigest()
+
+def ler_filtros(valores):
+    """Lê os filtros de conversão parcial dos parâmetros da requisição.
+
+    paginas: "3", "2-5" ou "4-" (até o fim); cliente: código do cliente;
+    limite: número máximo de linhas. Levanta ValueError se algum for inválido.
+    """
+    filtros = {}
+    texto = (valores.get("paginas") or "").strip()
+    if texto:
+        invalido = ValueError("Intervalo de páginas inválido. Use, por exemplo, 3, 2-5 ou 4-")
+        encontrado = re.fullmatch(r"(\d+)(-(\d*))?", texto)
+        if not encontrado:
+            raise invalido
+        primeira = int(encontrado.group(1))
+        if encontrado.group(2) is None:
+            ultima = primeira
+        elif encontrado.group(3):
+            ultima = int(encontrado.group(3))
+        else:
+            ultima = None
+        if primeira < 1 or (ultima is not None and ultima < primeira):
+            raise invalido
+        filtros["paginas"] = (primeira, ultima)
+
+    cliente = (valores.get("cliente") or "").strip()
+    if cliente:
+        if not cliente.isdecimal():
+            raise ValueError("Código de cliente inválido")
+        filtros["cliente"] = cliente
+
+    limite = (valores.get("limite") or "").strip()
+    if limite:
+        if not limite.isdecimal() or int(limite) < 1:
+            raise ValueError("Limite de linhas inválido")
+        filtros["limite"] = int(limite)
+    return filtros
+
+def chave_relatorio(sha256_pdf):
+    # O backend entra na chave: o texto extraído pode diferir entre eles
+    return f"{sha256_pdf}-{VERSAO_PARSER}-{app.config['PDF_BACKEND']}"
+
+def chave_resultado(sha256_pdf, formato="xlsx", filtros=None):
+    partes = [chave_relatorio(sha256_pdf)]
+    filtros = filtros or {}
+    if filtros.get("paginas"):
+        primeira, ultima = filtros["paginas"]
+        partes.append(f"p{primeira}_{ultima or ''}")
+    if filtros.get("cliente"):
+        partes.append(f"c{filtros['cliente']}")
+    if filtros.get("limite"):
+        partes.append(f"l{filtros['limite']}")
+    return "-".join(partes) + f".{formato}"
+
+def formato_disponivel(formato):
+    """Se o formato de saída existe e suas dependências opcionais estão instaladas"""
+    if formato not in FORMATOS_SAIDA:
+        return False
+    if formato == "xlsxwriter":
+        return xlsxwriter is not None
+    if formato == "parquet":
+        return importlib.util.find_spec("pyarrow") is not None
+    return True
+
+def _espelho_indice(gravacao):
+    """Destino das linhas para a gravação no índice; uma falha no índice não interrompe a conversão"""
+    def espelho(linha):
+        if not gravacao.ativa:
+            return
+        try:
+            gravacao.adicionar(linha)
+        except sqlite3.Error as e:
+            logger.warning(f"Falha ao indexar o relatório {gravacao.relatorio[:12]}: {e}")
+            _cancelar_gravacao(gravacao)
+    return espelho
+
+def _cancelar_gravacao(gravacao):
+    try:
+        gravacao.cancelar()
+    except sqlite3.Error as e:
+        logger.warning(f"Falha ao descartar a indexação de {gravacao.relatorio[:12]}: {e}")
+
+def converter_com_cache(fonte, sha256_pdf, formato="xlsx", filtros=None, nome_arquivo=None, **kwargs):
+    """Converte o PDF ou reaproveita o arquivo já gerado para o mesmo conteúdo.
+
+    fonte é um caminho ou um arquivo aberto. Retorna (arquivo, registros, status):
+    o arquivo no formato pedido para leitura (do cache ou gerado em memória), o
+    número de registros (None quando vem do cache) e "HIT" ou "MISS".
+    filtros (de ler_filtros) restringem a conversão e fazem parte da chave.
+    Conversões completas de relatórios ainda não indexados também gravam as
+    linhas no índice (nome_arquivo fica registrado junto); resultados do cache
+    nunca reabrem o PDF só para indexar.
+    """
+    filtros = filtros or {}
+    chave = chave_resultado(sha256_pdf, formato, filtros)
+    if app.config["CACHE_ENABLED"]:
+        # O resultado em cache é servido mesmo que o relatório não esteja (mais) no
+        # índice: ele só é indexado na próxima vez que precisar ser convertido
+        arquivo = cache_resultados().abrir(chave)
+        if arquivo is not None:
+            contar("cache_resultados_hit")
+            logger.info(f"Resultado encontrado no cache: {chave}")
+            return arquivo, None, "HIT"
+        contar("cache_resultados_miss")
+
+    # Só agora a requisição disputa uma vaga de conversão
+    ocupar_vaga_conversao()
+
+    # Conversão completa de relatório ainda não indexado: as linhas vão para o
+    # índice em lotes durante a própria conversão
+    gravacao = None
+    indice = indice_relatorios() if not filtros else None
+    if indice is not None:
+        relatorio = chave_relatorio(sha256_pdf)
+        try:
+            if not indice.contem(relatorio):
+                gravacao = indice.iniciar_gravacao(relatorio, sha256_pdf, nome_arquivo)
+        except sqlite3.Error as e:
+            logger.warning(f"Índice de relatórios indisponível: {e}")
+
+    saida = BytesIO()
+    espelho = _espelho_indice(gravacao) if gravacao is not None else None
+    # Páginas lidas nesta conversão, registradas no índice junto com as linhas
+    cronometro = _cronometro.get()
+    paginas_antes = cronometro.contagens.get("paginas", 0) if cronometro is not None else None
+    try:
+        registros = processar_pdf(fonte, saida, formato=formato, espelho=espelho, **filtros, **kwargs)
+    except BaseException:
+        if gravacao is not None:
+            _cancelar_gravacao(gravacao)
+        raise
+    if gravacao is not None:
+        try:
+            paginas = cronometro.contagens.get("paginas", 0) - paginas_antes if cronometro is not None else None
+            gravacao.concluir(paginas)
+        except sqlite3.Error as e:
+            # O índice é auxiliar: a conversão continua valendo sem ele
+            logger.warning(f"Falha ao indexar o relatório {gravacao.relatorio[:12]}: {e}")
+    if app.config["CACHE_ENABLED"]:
+        with etapa("gravar_cache"):
+            cache_resultados().guardar_bytes(chave, saida.getbuffer())
+    saida.seek(0)
+    return saida, registros, "MISS"
+
+def etag_conteudo(arquivo):
+    """SHA-256 do conteúdo do arquivo aberto, preservando a posição de leitura"""
+    if isinstance(arquivo, BytesIO):
+        return hashlib.sha256(arquivo.getbuffer()).hexdigest()
+    posicao = arquivo.tell()
+    arquivo.seek(0)
+    sha256 = hashlib.sha256()
+    while True:
+        bloco = arquivo.read(64 * 1024)
+        if not bloco:
+            break
+        sha256.update(bloco)
+    arquivo.seek(posicao)
+    return sha256.hexdigest()
+
+def enviar_arquivo(arquivo, download_name, mimetype=MIMETYPE_XLSX, etag=None):
+    """Resposta que envia o arquivo em blocos, com ETag e suporte a Range.
+
+    O send_file só conhece o tamanho de BytesIO e caminhos, por isso a
+    resposta condicional é montada aqui com o tamanho real do arquivo.
+    """
+    with etapa("resposta"):
+        if etag is None:
+            etag = etag_conteudo(arquivo)
+        arquivo.seek(0, os.SEEK_END)
+        tamanho = arquivo.tell()
+        arquivo.seek(0)
+        response = send_file(arquivo, mimetype=mimetype, as_attachment=True,
+                             download_name=download_name, etag=etag, conditional=False)
+        response.content_length = tamanho
+        # Range e If-None-Match só se aplicam a GET/HEAD; no POST a resposta é completa
+        return response.make_conditional(request.environ, accept_ranges=True, complete_length=tamanho)
+
+def _perfilar_requisicao():
+    if request.path == "/metrics":
+        return False
+    if app.config["PROFILE_REQUESTS"]:
+        return True
+    token = app.config["PROFILE_TOKEN"]
+    return bool(token) and request.headers.get("X-Profile") == token
+
+@app.before_request
+def iniciar_instrumentacao():
+    g.inicio_requisicao = time.perf_counter()
+    g.cronometro = Cronometro()
+    g.token_cronometro = _cronometro.set(g.cronometro)
+    g.perfil = None
+    if _perfilar_requisicao():
+        g.perfil = cProfile.Profile()
+        g.perfil.enable()
+
+@app.after_request
+def finalizar_instrumentacao(response):
+    cronometro = g.get("cronometro")
+    if cronometro is None:
+        return response
+    duracao = time.perf_counter() - g.inicio_requisicao
+    rota = request.url_rule.rule if request.url_rule else "desconhecida"
+
+    if g.perfil is not None:
+        g.perfil.disable()
+        try:
+            os.makedirs(app.config["PROFILE_FOLDER"], exist_ok=True)
+            nome = f"perfil-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.prof"
+            g.perfil.dump_stats(os.path.join(app.config["PROFILE_FOLDER"], nome))
+            response.headers["X-Profile-File"] = nome
+            logger.info(f"Perfil de {request.method} {rota} salvo em {nome}")
+        except OSError as e:
+            logger.warning(f"Erro ao salvar perfil: {e}")
+        g.perfil = None
+
+    if cronometro.etapas:
+        registrar_conversao(cronometro)
+        # Tempos por etapa visíveis no navegador (DevTools) e em proxies
+        response.headers["Server-Timing"] = ", ".join(
+            [f"{nome};dur={segundos * 1000:.1f}" for nome, segundos in cronometro.etapas.items()]
+            + [f"{nome}_processos;dur={segundos * 1000:.1f}" for nome, segundos in cronometro.processos.items()]
+            + [f"total;dur={duracao * 1000:.1f}"])
+
+    metricas.incrementar("conversor_requisicoes_total", rota=rota, status=response.status_code)
+    metricas.observar("conversor_requisicao_segundos", duracao, rota=rota)
+    metricas.incrementar("conversor_bytes_recebidos_total", request.content_length or 0)
+    metricas.incrementar("conversor_bytes_enviados_total", response.content_length or 0)
+    return response
+
+@app.teardown_request
+def encerrar_instrumentacao(exc):
+    perfil = g.get("perfil")
+    if perfil is not None:
+        perfil.disable()
+    token = g.pop("token_cronometro", None)
+    if token is not None:
+        _cronometro.reset(token)
+
+@app.route("/metrics", methods=["GET"])
+def exportar_metricas():
+    return Response(metricas.exportar(), mimetype="text/plain; version=0.0.4")
+
 @app.route("/", methods=["GET", "POST"])
+@com_admissao()
+@com_area_temporaria
 def index():
     if request.method == "POST":
         try:
@@ -252,63 +2191,49 @@ def index():
             if not file.filename.lower().endswith('.pdf'):
                 return jsonify({"error": "Apenas arquivos PDF são aceitos"}), 400
 
-            # Salvar arquivo temporariamente
-            filename = f"{uuid.uuid4().hex}.pdf"
-            filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-            
+            # Formato de saída: campo do formulário ou parâmetro da URL (padrão xlsx)
+            formato = request.form.get("formato") or request.args.get("formato", "xlsx")
+            if not formato_disponivel(formato):
+                disponiveis = [nome for nome in FORMATOS_SAIDA if formato_disponivel(nome)]
+                return jsonify({"error": f"Formato indisponível. Use: {', '.join(disponiveis)}"}), 400
+            extensao, mimetype, _ = FORMATOS_SAIDA[formato]
+
+            # Conversão parcial: intervalo de páginas, código de cliente e limite de linhas
             try:
-                file.save(filepath)
-                logger.info(f"Arquivo salvo temporariamente: {filepath}")
-
-                # Verificar se arquivo foi salvo corretamente
-                if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
-                    raise Exception("Erro ao salvar arquivo temporário")
-
-                # Processar PDF
-                output_filename = filename.replace(".pdf", ".xlsx")
-                output_filepath = os.path.join(app.config["OUTPUT_FOLDER"], output_filename)
-
-                registros_processados = processar_pdf(filepath, output_filepath)
-                
-                # Verificar se Excel foi criado
-                if not os.path.exists(output_filepath):
-                    raise Exception("Erro ao gerar arquivo Excel")
-
-                # Ler arquivo para envio
-                with open(output_filepath, 'rb') as f:
-                    file_data = f.read()
-                
-                # Limpar arquivos temporários
-                try:
-                    os.remove(filepath)
-                    os.remove(output_filepath)
-                except Exception as e:
-                    logger.warning(f"Erro ao limpar arquivos temporários: {e}")
-                
+                filtros = ler_filtros(request.values)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            try:
+                # O upload é lido direto da memória (ou do spool em disco, se grande)
+                with etapa("upload"):
+                    sha256_pdf = hash_upload(file.stream)
+                resultado, registros_processados, status_cache = converter_com_cache(
+                    file.stream, sha256_pdf, formato, filtros, nome_arquivo=file.filename)
+
                 # Criar resposta com nome mais descritivo
                 original_name = file.filename.replace('.pdf', '')
-                download_name = f"pendencias_{original_name}_{uuid.uuid4().hex[:8]}.xlsx"
-                
-                response = Response(
-                    file_data,
-                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                    headers={
-                        'Content-Disposition': f'attachment; filename="{download_name}"',
-                        'Content-Length': str(len(file_data))
-                    }
-                )
-                
-                logger.info(f"Conversão concluída: {registros_processados} registros processados")
+                download_name = f"pendencias_{original_name}_{uuid.uuid4().hex[:8]}.{extensao}"
+
+                # Enviado em blocos, sem copiar o arquivo inteiro para a resposta
+                response = enviar_arquivo(resultado, download_name, mimetype)
+                response.headers["X-Cache"] = status_cache
+                if app.config["CACHE_ENABLED"]:
+                    # Endereço para retomar o download com Range/If-Range
+                    response.headers["Content-Location"] = f"/resultados/{chave_resultado(sha256_pdf, formato, filtros)}"
+
+                if registros_processados is None:
+                    logger.info("Conversão concluída: resultado servido do cache")
+                else:
+                    logger.info(f"Conversão concluída: {registros_processados} registros processados")
                 return response
-                
+
+            except LimiteExcedido as e:
+                return resposta_limite(e)
+            except SemResultados as e:
+                logger.info(f"Conversão sem resultados: {e}")
+                return jsonify({"error": str(e)}), 404
             except Exception as e:
-                # Limpar arquivo temporário em caso de erro
-                try:
-                    if os.path.exists(filepath):
-                        os.remove(filepath)
-                except:
-                    pass
-                    
                 logger.error(f"Erro no processamento: {str(e)}")
                 return jsonify({"error": f"Erro ao processar PDF: {str(e)}"}), 500
 
@@ -547,6 +2472,580 @@ def index():
     
     return html_content
 
+# Conversões assíncronas: o estado de cada job fica em um JSON ao lado do
+# resultado, para ser consultado por qualquer processo do servidor
+_executor_jobs = None
+_vagas_jobs = None
+_lock_jobs = threading.Lock()
+_ultima_limpeza_jobs = 0.0
+# Jobs aguardando ou em execução neste processo
+_jobs_pendentes = 0
+
+def _ajustar_jobs_pendentes(delta):
+    global _jobs_pendentes
+    with _lock_jobs:
+        _jobs_pendentes += delta
+
+metricas.definir("conversor_jobs_fila", "gauge", "Jobs aguardando ou em execução", funcao=lambda: _jobs_pendentes)
+
+def _executor():
+    """Cria o executor de jobs sob demanda (após o fork dos workers do servidor)"""
+    global _executor_jobs, _vagas_jobs
+    with _lock_jobs:
+        if _executor_jobs is None:
+            _executor_jobs = ThreadPoolExecutor(max_workers=app.config["JOB_WORKERS"],
+                                                thread_name_prefix="job")
+            _vagas_jobs = threading.BoundedSemaphore(app.config["JOB_WORKERS"] + app.config["JOB_QUEUE_SIZE"])
+    return _executor_jobs
+
+def _caminho_job(job_id, extensao):
+    return os.path.join(app.config["JOBS_FOLDER"], f"{job_id}.{extensao}")
+
+def _salvar_estado_job(estado):
+    """Grava o estado do job de forma atômica"""
+    caminho = _caminho_job(estado["id"], "json")
+    temporario = f"{caminho}.{threading.get_ident()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+def _ler_estado_job(job_id):
+    if not re.fullmatch(r"[0-9a-f]{32}", job_id):
+        return None
+    try:
+        with open(_caminho_job(job_id, "json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def limpar_jobs_expirados(forcar=False):
+    """Remove estado e resultado de jobs mais antigos que JOB_TTL"""
+    global _ultima_limpeza_jobs
+    agora = time.time()
+    if not forcar and agora - _ultima_limpeza_jobs < 60:
+        return
+    _ultima_limpeza_jobs = agora
+
+    pasta = app.config["JOBS_FOLDER"]
+    try:
+        nomes = os.listdir(pasta)
+    except OSError:
+        return
+    for nome in nomes:
+        caminho = os.path.join(pasta, nome)
+        try:
+            if agora - os.path.getmtime(caminho) > app.config["JOB_TTL"]:
+                os.remove(caminho)
+                logger.info(f"Arquivo de job expirado removido: {nome}")
+        except OSError:
+            pass
+
+def _contagens_do_indice(estado, sha256_pdf):
+    """Preenche páginas e linhas de um job servido do cache com os dados do índice.
+
+    O PDF não é aberto: se o relatório não estiver indexado, rows e pages_total
+    continuam null e pages_processed continua 0.
+    """
+    indice = indice_relatorios()
+    if indice is None:
+        return
+    try:
+        dados = indice.relatorio(chave_relatorio(sha256_pdf))
+    except sqlite3.Error as e:
+        logger.warning(f"Índice de relatórios indisponível: {e}")
+        return
+    if dados is None:
+        return
+    estado["rows"] = dados["linhas"]
+    if dados["paginas"] is not None:
+        estado["pages_processed"] = estado["pages_total"] = dados["paginas"]
+
+def _executar_job(estado, pasta, filepath, output_filepath, sha256_pdf):
+    """Executa a conversão de um job em segundo plano; a área de rascunho do job (com o PDF) é removida ao final"""
+    ultima_gravacao = [0.0]
+
+    def progresso(processadas, total):
+        estado["pages_processed"] = processadas
+        estado["pages_total"] = total
+        # Limitar a frequência de gravação do estado
+        if processadas == total or time.time() - ultima_gravacao[0] >= 0.5:
+            ultima_gravacao[0] = time.time()
+            _salvar_estado_job(estado)
+
+    with espaco_temporario().usar_area(pasta):
+        cronometro = Cronometro()
+        _cronometro.set(cronometro)
+        try:
+            estado["state"] = "running"
+            _salvar_estado_job(estado)
+            resultado, estado["rows"], estado["cache"] = converter_com_cache(
+                filepath, sha256_pdf, nome_arquivo=estado["filename"], progresso=progresso)
+            if estado["cache"] == "HIT":
+                _contagens_do_indice(estado, sha256_pdf)
+            with resultado, open(output_filepath, "wb") as destino:
+                estado["etag"] = etag_conteudo(resultado)
+                shutil.copyfileobj(resultado, destino)
+            estado["state"] = "done"
+            logger.info(f"Job {estado['id']} concluído: {estado['rows']} registros")
+        except Exception as e:
+            estado["state"] = "failed"
+            estado["error"] = str(e)
+            logger.error(f"Job {estado['id']} falhou: {e}")
+            try:
+                if os.path.exists(output_filepath):
+                    os.remove(output_filepath)
+            except OSError:
+                pass
+        finally:
+            registrar_conversao(cronometro)
+            estado["timings"] = {nome: round(segundos, 4) for nome, segundos in cronometro.etapas.items()}
+            if cronometro.processos:
+                estado["process_timings"] = {nome: round(segundos, 4) for nome, segundos in cronometro.processos.items()}
+            estado["finished_at"] = time.time()
+            _salvar_estado_job(estado)
+            _ajustar_jobs_pendentes(-1)
+            _vagas_jobs.release()
+
+@app.route("/jobs", methods=["POST"])
+@com_admissao(conversao=False)
+@com_area_temporaria
+def criar_job():
+    limpar_jobs_expirados()
+
+    if "file" not in request.files:
+        return jsonify({"error": "Nenhum arquivo enviado"}), 400
+
+    file = request.files["file"]
+    if file.filename == "":
+        return jsonify({"error": "Nenhum arquivo selecionado"}), 400
+
+    if not file.filename.lower().endswith('.pdf'):
+        return jsonify({"error": "Apenas arquivos PDF são aceitos"}), 400
+
+    executor = _executor()
+    if not _vagas_jobs.acquire(blocking=False):
+        response = jsonify({"error": "Fila de conversões cheia. Tente novamente em instantes."})
+        response.headers["Retry-After"] = "30"
+        return response, 429
+    _ajustar_jobs_pendentes(1)
+
+    job_id = uuid.uuid4().hex
+    pasta = None
+    try:
+        # O PDF sobrevive à requisição: fica em uma área própria, liberada pelo job.
+        # A reserva é só do PDF (a área da requisição já cobriu o spool do upload);
+        # o que o job gravar além disso conta pelo tamanho real da pasta
+        pasta = espaco_temporario().criar_area(request.content_length or app.config["MAX_CONTENT_LENGTH"])
+        os.makedirs(app.config["JOBS_FOLDER"], exist_ok=True)
+        filepath = os.path.join(pasta, f"{job_id}.pdf")
+        with etapa("upload"):
+            sha256_pdf = salvar_upload(file, filepath)
+
+        estado = {
+            "id": job_id,
+            "state": "queued",
+            "filename": file.filename,
+            "pages_processed": 0,
+            "pages_total": None,
+            "rows": None,
+            "cache": None,
+            "error": None,
+            "etag": None,
+            "timings": None,
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        _salvar_estado_job(estado)
+        executor.submit(_executar_job, estado, pasta, filepath, _caminho_job(job_id, "xlsx"), sha256_pdf)
+    except Exception as e:
+        _ajustar_jobs_pendentes(-1)
+        _vagas_jobs.release()
+        if pasta is not None:
+            espaco_temporario().liberar_area(pasta)
+        if isinstance(e, EspacoInsuficiente):
+            response = jsonify({"error": str(e)})
+            response.headers["Retry-After"] = "30"
+            return response, 507
+        logger.error(f"Erro ao criar job: {e}")
+        return jsonify({"error": f"Erro ao criar job: {str(e)}"}), 500
+
+    logger.info(f"Job {job_id} enfileirado: {file.filename}")
+    response = jsonify({
+        "id": job_id,
+        "state": "queued",
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result",
+    })
+    response.headers["Location"] = f"/jobs/{job_id}"
+    return response, 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def status_job(job_id):
+    """Estado do job. Em resultados do cache (cache "HIT") rows e pages_* vêm do
+    índice de relatórios; sem o relatório indexado ficam null (pages_processed 0)."""
+    limpar_jobs_expirados()
+    estado = _ler_estado_job(job_id)
+    if estado is None:
+        return jsonify({"error": "Job não encontrado"}), 404
+    return jsonify(estado)
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def resultado_job(job_id):
+    estado = _ler_estado_job(job_id)
+    if estado is None:
+        return jsonify({"error": "Job não encontrado"}), 404
+    if estado["state"] == "failed":
+        return jsonify({"error": f"Erro ao processar PDF: {estado['error']}"}), 500
+    output_filepath = _caminho_job(job_id, "xlsx")
+    if estado["state"] != "done" or not os.path.exists(output_filepath):
+        return jsonify({"error": "Conversão ainda não concluída", "state": estado["state"]}), 409
+
+    original_name = estado["filename"].replace('.pdf', '')
+    return send_file(
+        output_filepath,
+        mimetype=MIMETYPE_XLSX,
+        as_attachment=True,
+        download_name=f"pendencias_{original_name}_{job_id[:8]}.xlsx",
+        etag=estado.get("etag") or True,
+        conditional=True,
+    )
+
+@app.route("/resultados/<chave>", methods=["GET"])
+def resultado_cache(chave):
+    """Resultado já convertido, servido do cache para downloads retomáveis"""
+    encontrado = re.fullmatch(r"[0-9a-f]{64}-[0-9a-f]{12}-[a-z0-9]+(?:-[a-z0-9_]+)*\.([a-z]+)", chave)
+    if not encontrado or encontrado.group(1) not in FORMATOS_SAIDA:
+        return jsonify({"error": "Resultado não encontrado"}), 404
+    arquivo = cache_resultados().abrir(chave) if app.config["CACHE_ENABLED"] else None
+    if arquivo is None:
+        return jsonify({"error": "Resultado não encontrado ou expirado"}), 404
+    extensao, mimetype, _ = FORMATOS_SAIDA[encontrado.group(1)]
+    return enviar_arquivo(arquivo, f"pendencias_{chave[:8]}.{extensao}", mimetype)
+
+# Consultas ao índice: respondem sem reenviar nem reprocessar o PDF
+LIMITE_CONSULTA = 1000
+LIMITE_CONSULTA_MAXIMO = 10000
+
+def _data_consulta(texto):
+    """Data "dd/mm/aaaa" ou "aaaa-mm-dd" da consulta, no formato ISO do índice"""
+    for formato in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(texto, formato).date().isoformat()
+        except ValueError:
+            pass
+    raise ValueError(f"Data inválida: {texto}. Use dd/mm/aaaa ou aaaa-mm-dd")
+
+def ler_consulta(valores):
+    """Critérios de /consulta. Levanta ValueError se algum for inválido"""
+    criterios = {}
+    cliente = (valores.get("cliente") or "").strip()
+    if cliente:
+        if not cliente.isdecimal():
+            raise ValueError("Código de cliente inválido")
+        criterios["cliente"] = cliente
+
+    tipo = (valores.get("tipo") or "").strip().upper()
+    if tipo:
+        if tipo not in ("BANC", "CART"):
+            raise ValueError("Tipo inválido. Use BANC ou CART")
+        criterios["tipo"] = tipo
+
+    for campo in ("vencimento_de", "vencimento_ate"):
+        texto = (valores.get(campo) or "").strip()
+        if texto:
+            criterios[campo] = _data_consulta(texto)
+
+    limite = (valores.get("limite") or "").strip()
+    if limite:
+        if not limite.isdecimal() or not 1 <= int(limite) <= LIMITE_CONSULTA_MAXIMO:
+            raise ValueError(f"Limite inválido. Use de 1 a {LIMITE_CONSULTA_MAXIMO}")
+        criterios["limite"] = int(limite)
+    else:
+        criterios["limite"] = LIMITE_CONSULTA
+    return criterios
+
+@app.route("/consulta/relatorios", methods=["GET"])
+def listar_relatorios():
+    indice = indice_relatorios()
+    if indice is None:
+        return jsonify({"error": "Índice de relatórios desativado"}), 404
+    return jsonify({"relatorios": indice.relatorios()})
+
+@app.route("/consulta", methods=["GET"])
+def consultar_titulos():
+    """Títulos de um relatório já convertido, filtrados por cliente, tipo e vencimento.
+
+    relatorio é o id de /consulta/relatorios ou o SHA-256 do PDF; sem ele a
+    consulta usa o relatório indexado mais recente.
+    """
+    indice = indice_relatorios()
+    if indice is None:
+        return jsonify({"error": "Índice de relatórios desativado"}), 404
+    try:
+        criterios = ler_consulta(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    relatorio = (request.args.get("relatorio") or "").strip().lower()
+    if re.fullmatch(r"[0-9a-f]{64}", relatorio):
+        relatorio = chave_relatorio(relatorio)
+    with etapa("consulta"):
+        dados = indice.relatorio(relatorio or None)
+        if dados is None:
+            return jsonify({"error": "Relatório não indexado. Converta o PDF antes de consultar"}), 404
+        titulos, total, soma = indice.consultar(dados["id"], **criterios)
+
+    return jsonify({
+        "relatorio": dados,
+        "total": total,
+        "valor_total": round(soma, 2),
+        "exibidos": len(titulos),
+        "titulos": [dict(zip(COLUNAS, titulo)) for titulo in titulos],
+    })
+
+# Conversão em lote: vários PDFs (ou um ZIP de PDFs) convertidos em paralelo
+SAIDAS_LOTE = ("planilhas", "unificada", "zip")
+
+def _converter_item_lote(pdf_path):
+    """Converte um PDF do lote em um processo do pool.
+
+    Retorna (DataFrame, segundos, etapas, contagens), com os tempos medidos no processo.
+    """
+    inicio = time.perf_counter()
+    cronometro = Cronometro()
+    token = _cronometro.set(cronometro)
+    # As páginas do item já foram reservadas por converter_lote no processo da
+    # requisição; a cópia herdada pelo fork não é devolvida por ninguém
+    token_reservas = _paginas_reservadas.set(None)
+    try:
+        dados = extrair_registros(pdf_path, workers=1)
+        if not dados:
+            raise Exception("Nenhum dado foi extraído do PDF. Verifique se o formato está correto.")
+        df = dados.para_dataframe()
+        cronometro.contar("linhas", len(df))
+    finally:
+        _paginas_reservadas.reset(token_reservas)
+        _cronometro.reset(token)
+    return df, time.perf_counter() - inicio, cronometro.etapas, cronometro.contagens
+
+def _arquivos_lote(arquivos, pasta):
+    """Salva os PDFs do lote na pasta, expandindo ZIPs: lista de (nome, caminho)"""
+    itens = []
+    restante = app.config["MAX_CONTENT_LENGTH"]
+
+    def adicionar(nome, origem):
+        if len(itens) >= app.config["BATCH_MAX_FILES"]:
+            raise ValueError(f"Máximo de {app.config['BATCH_MAX_FILES']} arquivos por lote")
+        caminho = os.path.join(pasta, f"{len(itens)}.pdf")
+        with open(caminho, "wb") as destino:
+            shutil.copyfileobj(origem, destino, 64 * 1024)
+        itens.append((nome, caminho))
+
+    for file in arquivos:
+        nome = file.filename or ""
+        if nome.lower().endswith(".pdf"):
+            adicionar(nome, file.stream)
+        elif nome.lower().endswith(".zip"):
+            try:
+                with zipfile.ZipFile(file.stream) as zf:
+                    for info in zf.infolist():
+                        if info.is_dir() or not info.filename.lower().endswith(".pdf"):
+                            continue
+                        # Limite do conteúdo descompactado, contra ZIPs maliciosos
+                        restante -= info.file_size
+                        if restante < 0:
+                            raise ValueError("Conteúdo descompactado do ZIP excede o limite")
+                        with zf.open(info) as origem:
+                            adicionar(os.path.basename(info.filename), origem)
+            except zipfile.BadZipFile:
+                raise ValueError(f"ZIP inválido: {nome}")
+        elif nome:
+            raise ValueError(f"Apenas arquivos PDF ou ZIP são aceitos: {nome}")
+    return itens
+
+def _nome_planilha(nome, usados):
+    """Nome de planilha válido no Excel (até 31 caracteres, sem repetir)"""
+    base = re.sub(r"[\[\]:*?/\\]", "_", os.path.splitext(nome)[0]).strip("'") or "PDF"
+    candidato = base[:31]
+    n = 2
+    while candidato.lower() in usados:
+        sufixo = f" ({n})"
+        candidato = base[:31 - len(sufixo)] + sufixo
+        n += 1
+    usados.add(candidato.lower())
+    return candidato
+
+def _reservar_item_lote(caminho):
+    """Reserva no orçamento as páginas de um PDF do lote; retorna a quantidade reservada"""
+    if _paginas_reservadas.get() is None or orcamento_paginas() is None:
+        return 0
+    try:
+        with abrir_pdf(caminho) as pdf:
+            paginas = len(pdf)
+    except Exception:
+        # PDF ilegível: a conversão do item falha e registra o erro no resumo
+        return 0
+    admitir_paginas(paginas)
+    return paginas
+
+def converter_lote(itens, workers=None):
+    """Converte os PDFs do lote; falhas são registradas sem interromper os demais.
+
+    As páginas de cada PDF são reservadas no orçamento antes da conversão e
+    devolvidas quando ela termina, então o lote pode somar mais páginas que
+    PAGE_BUDGET. Um PDF maior que o orçamento inteiro vira erro no resumo; sem
+    orçamento livre e sem conversões do lote em andamento, LimiteExcedido sobe
+    para a requisição.
+
+    Retorna (resumo, quadros): uma entrada de resumo por arquivo, na ordem
+    recebida, e a lista de (nome, DataFrame) dos arquivos convertidos.
+    """
+    if workers is None:
+        workers = app.config["BATCH_WORKERS"]
+    workers = max(1, min(workers, len(itens)))
+
+    resultados = [None] * len(itens)
+    # (posição, futuro, páginas reservadas) dos itens enviados ao pool
+    em_andamento = deque()
+
+    def concluir_proximo():
+        posicao, futuro, paginas = em_andamento.popleft()
+        try:
+            with etapa("aguardar_processos"):
+                resultados[posicao] = futuro.result()
+        except Exception as e:
+            resultados[posicao] = e
+        finally:
+            liberar_paginas(paginas)
+
+    with ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext() as pool:
+        for posicao, (_, caminho) in enumerate(itens):
+            while True:
+                try:
+                    paginas = _reservar_item_lote(caminho)
+                    break
+                except LimiteExcedido as e:
+                    if e.status == 413:
+                        paginas = None
+                        resultados[posicao] = e
+                        break
+                    if not em_andamento:
+                        raise
+                    # Orçamento cheio: espera um item do próprio lote devolver suas páginas
+                    concluir_proximo()
+            if paginas is None:
+                continue
+            if pool is None:
+                try:
+                    with etapa("converter_itens"):
+                        resultados[posicao] = _converter_item_lote(caminho)
+                except Exception as e:
+                    resultados[posicao] = e
+                finally:
+                    liberar_paginas(paginas)
+            else:
+                em_andamento.append((posicao, pool.submit(_converter_item_lote, caminho), paginas))
+        while em_andamento:
+            concluir_proximo()
+
+    resumo = []
+    quadros = []
+    for (nome, _), resultado in zip(itens, resultados):
+        if isinstance(resultado, Exception):
+            logger.error(f"Lote: falha em {nome}: {resultado}")
+            resumo.append({"arquivo": nome, "registros": 0, "segundos": None, "erro": str(resultado)})
+            continue
+        df, segundos, etapas, contagens = resultado
+        cronometro = _cronometro.get()
+        if cronometro is not None:
+            cronometro.somar(etapas, contagens)
+        logger.info(f"Lote: {nome} convertido com {len(df)} registros em {segundos:.2f}s")
+        resumo.append({"arquivo": nome, "registros": len(df), "segundos": round(segundos, 3), "erro": None})
+        quadros.append((nome, df))
+    return resumo, quadros
+
+def gravar_saida_lote(resumo, quadros, saida):
+    """Monta o resultado do lote em memória: (BytesIO, extensão, mimetype)"""
+    resultado = BytesIO()
+    df_resumo = pd.DataFrame(resumo).rename(columns={
+        "arquivo": "Arquivo", "registros": "Registros", "segundos": "Segundos", "erro": "Erro"})
+
+    if saida == "zip":
+        usados = set()
+        with zipfile.ZipFile(resultado, "w", zipfile.ZIP_DEFLATED) as zf:
+            for nome, df in quadros:
+                planilha = BytesIO()
+                with pd.ExcelWriter(planilha, engine="openpyxl") as writer:
+                    escrever_planilha(writer, df, "Pendências")
+                zf.writestr(f"{_nome_planilha(nome, usados)}.xlsx", planilha.getbuffer())
+            zf.writestr("resumo.json", json.dumps(resumo, ensure_ascii=False, indent=2))
+        resultado.seek(0)
+        return resultado, "zip", "application/zip"
+
+    with pd.ExcelWriter(resultado, engine="openpyxl") as writer:
+        if saida == "unificada":
+            df = pd.concat([df.assign(Arquivo=nome) for nome, df in quadros], ignore_index=True)
+            df = df[["Arquivo"] + COLUNAS]
+            escrever_planilha(writer, df, "Pendências")
+        else:
+            usados = {"resumo"}
+            for nome, df in quadros:
+                escrever_planilha(writer, df, _nome_planilha(nome, usados))
+        escrever_planilha(writer, df_resumo, "Resumo")
+    resultado.seek(0)
+    return resultado, "xlsx", MIMETYPE_XLSX
+
+@app.route("/lote", methods=["POST"])
+@com_admissao()
+@com_area_temporaria
+def converter_lote_endpoint():
+    """Converte vários PDFs (campo "files", PDFs ou ZIPs) em uma única resposta.
+
+    O campo "saida" escolhe o resultado: "planilhas" (uma planilha por PDF),
+    "unificada" (uma planilha com a coluna Arquivo) ou "zip" (um Excel por PDF).
+    O tempo e o número de registros de cada arquivo vão na planilha/arquivo
+    de resumo e no cabeçalho X-Lote-Resumo.
+    """
+    saida = request.form.get("saida", "planilhas")
+    if saida not in SAIDAS_LOTE:
+        return jsonify({"error": f"Saída inválida. Use: {', '.join(SAIDAS_LOTE)}"}), 400
+
+    arquivos = request.files.getlist("files")
+    if not arquivos or all(not f.filename for f in arquivos):
+        return jsonify({"error": "Nenhum arquivo enviado"}), 400
+
+    inicio = time.perf_counter()
+    try:
+        with tempfile.TemporaryDirectory(dir=pasta_temporaria()) as pasta:
+            try:
+                with etapa("upload"):
+                    itens = _arquivos_lote(arquivos, pasta)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            if not itens:
+                return jsonify({"error": "Nenhum PDF encontrado no envio"}), 400
+
+            try:
+                ocupar_vaga_conversao()
+                resumo, quadros = converter_lote(itens)
+            except LimiteExcedido as e:
+                return resposta_limite(e)
+
+        if not quadros:
+            return jsonify({"error": "Nenhum PDF do lote pôde ser convertido", "arquivos": resumo}), 500
+
+        with etapa("excel"):
+            resultado, extensao, mimetype = gravar_saida_lote(resumo, quadros, saida)
+    except Exception as e:
+        logger.error(f"Erro no processamento do lote: {str(e)}")
+        return jsonify({"error": f"Erro ao processar lote: {str(e)}"}), 500
+
+    total = sum(item["registros"] for item in resumo)
+    logger.info(f"Lote concluído: {len(itens)} arquivos, {total} registros em {time.perf_counter() - inicio:.2f}s")
+    response = enviar_arquivo(resultado, f"pendencias_lote_{uuid.uuid4().hex[:8]}.{extensao}", mimetype)
+    response.headers["X-Lote-Resumo"] = json.dumps(resumo)
+    return response
+
 @app.errorhandler(413)
 def too_large(e):
     return jsonify({"error": "Arquivo muito grande. Tamanho máximo: 50MB."}), 413
@@ -555,6 +3054,10 @@ def too_large(e):
 def internal_error(e):
     return jsonify({"error": "Erro interno do servidor."}), 500
 
+# Tempo de importação do módulo e das bibliotecas (com preload, pago uma vez no master)
+TEMPO_IMPORTACAO = time.perf_counter() - _inicio_importacao
+logger.info(f"Aplicação carregada em {TEMPO_IMPORTACAO:.2f}s")
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     logger.info(f"Iniciando servidor na porta {port}")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Memória por título: lista de listas + DataFrame x BufferColunar.
+
+Uso: python benchmarks/bench_buffer_colunar.py [numero_de_linhas]
+"""
+import gc
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app import (COLUNAS, COLUNAS_DATAS, COLUNAS_NUMERICAS, BufferColunar, combinar_paginas,
+                 converter_datas, converter_valores_numericos, parsear_pagina)
+from bench_classificador import gerar_corpus
+
+logging.disable(logging.INFO)
+
+def gerar_paginas(paginas):
+    return (parsear_pagina(texto, page_num) for page_num, texto in enumerate(paginas, 1))
+
+def acumular_listas(paginas):
+    dados = list(combinar_paginas(gerar_paginas(paginas)))
+    return dados
+
+def dataframe_listas(dados):
+    import pandas as pd
+    df = pd.DataFrame(dados, columns=COLUNAS)
+    for col in COLUNAS_NUMERICAS:
+        df[col] = converter_valores_numericos(df[col])
+    for col in COLUNAS_DATAS:
+        df[col] = converter_datas(df[col])
+    return df
+
+def acumular_buffer(paginas):
+    dados = BufferColunar()
+    for linha in combinar_paginas(gerar_paginas(paginas)):
+        dados.append(linha)
+    return dados
+
+def dataframe_buffer(dados):
+    return dados.para_dataframe()
+
+def medir(acumular, montar_dataframe, paginas):
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    dados = acumular(paginas)
+    acumulado, _ = tracemalloc.get_traced_memory()
+    df = montar_dataframe(dados)
+    _, pico = tracemalloc.get_traced_memory()
+    segundos = time.perf_counter() - inicio
+    tracemalloc.stop()
+    return len(df), acumulado, pico, segundos
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    linhas = gerar_corpus(total)
+    # Páginas de 50 linhas, como no relatório
+    paginas = ["\n".join(linhas[i:i + 50]) for i in range(0, len(linhas), 50)]
+
+    for nome, acumular, montar in (("listas", acumular_listas, dataframe_listas),
+                                   ("colunar", acumular_buffer, dataframe_buffer)):
+        registros, acumulado, pico, segundos = medir(acumular, montar, paginas)
+        print(f"{nome:>8}: {registros} títulos  acumulado {acumulado / registros:6.0f} B/título  "
+              f"pico com DataFrame {pico / 2**20:7.1f} MiB  {segundos:5.2f}s")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Micro-benchmark da classificação de linhas: cascata de regex x passada única.
+
+Uso: python benchmarks/bench_classificador.py [numero_de_linhas]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app import Cliente, classificar_linha, logger, regex_cliente, regex_titulo_banc, regex_titulo_cart
+
+# Filtro de cabeçalhos e totais do laço anterior; a classificação atual descarta
+# essas linhas por não começarem com dígito
+regex_ignorar = re.compile(r"^(TOTAL|Limite|[-=]+|Docto|Vencidas|Total|Financeiro|LB Palmas|Pendencia|Rota|Somente).*")
+
+def gerar_corpus(total, seed=42):
+    """Linhas no formato do relatório: cabeçalhos, clientes, títulos BANC/CART e totais"""
+    rnd = random.Random(seed)
+    linhas = []
+    while len(linhas) < total:
+        linhas.append("Docto Emissao Vencto ATS Tipo Boleto Valor Juros Multa Tarifa Total")
+        linhas.append(f"{rnd.randint(1, 99999)} COMERCIAL SANTOS & FILHOS (63){rnd.randint(3000, 99999)}-{rnd.randint(1000, 9999)} PALMAS")
+        for i in range(rnd.randint(1, 30)):
+            datas = f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2024 {rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2025"
+            if rnd.random() < 0.6:
+                linhas.append(f"{rnd.randint(1, 99999)}.{i:02d} {datas} {rnd.randint(0, 400)} BANC {rnd.randint(100000, 999999)} 1.234,56 12,34 24,69 3,50 1.275,09")
+            else:
+                linhas.append(f"{rnd.randint(1, 99999)}.{i:02d} {datas} {rnd.randint(0, 400)} CART 500,00 0,00 0,00 0,00 500,00")
+        linhas.append(f"TOTAL CLIENTE {rnd.randint(1, 9999)},00")
+        linhas.append("-" * 40)
+    return linhas[:total]
+
+def classificar_cascata(linhas):
+    """Laço anterior: até quatro regex por linha, cada uma em seu try/except"""
+    dados = []
+    cliente_atual = None
+    for linha_num, linha in enumerate(linhas, 1):
+        linha = linha.strip()
+        if not linha or len(linha) < 5:
+            continue
+        if regex_ignorar.match(linha):
+            continue
+        if linha_num <= 10:
+            logger.debug(f"Linha {linha_num}: {linha}")
+        try:
+            match_cliente = regex_cliente.match(linha)
+            if match_cliente:
+                codigo_cliente_atual = match_cliente.group(1).strip()
+                cliente_atual = match_cliente.group(2).strip()
+                ddd = match_cliente.group(3).strip()
+                numero = match_cliente.group(4).strip()
+                telefone_atual = f"({ddd}){numero}"
+                cidade_atual = match_cliente.group(5).strip()
+                continue
+        except Exception as e:
+            logger.debug(f"Erro ao processar cliente na linha {linha_num}: {e}")
+        try:
+            match_banc = regex_titulo_banc.match(linha)
+            if match_banc and cliente_atual:
+                documento = match_banc.group(1)
+                emissao = match_banc.group(2)
+                vencimento = match_banc.group(3)
+                ats = match_banc.group(4)
+                tipo = match_banc.group(5)
+                boleto = match_banc.group(6)
+                valor_doc = match_banc.group(7)
+                juros = match_banc.group(8)
+                multa = match_banc.group(9)
+                tarifa = match_banc.group(10)
+                valor_total = match_banc.group(11)
+                dados.append([
+                    codigo_cliente_atual, cliente_atual, telefone_atual, cidade_atual,
+                    documento, emissao, vencimento, ats, tipo, boleto,
+                    valor_doc, juros, multa, tarifa, valor_total
+                ])
+                continue
+        except Exception as e:
+            logger.debug(f"Erro ao processar título BANC na linha {linha_num}: {e}")
+        try:
+            match_cart = regex_titulo_cart.match(linha)
+            if match_cart and cliente_atual:
+                documento = match_cart.group(1)
+                emissao = match_cart.group(2)
+                vencimento = match_cart.group(3)
+                ats = match_cart.group(4)
+                tipo = match_cart.group(5)
+                boleto = ""
+                valor_doc = match_cart.group(6)
+                juros = match_cart.group(7)
+                multa = match_cart.group(8)
+                tarifa = match_cart.group(9)
+                valor_total = match_cart.group(10)
+                dados.append([
+                    codigo_cliente_atual, cliente_atual, telefone_atual, cidade_atual,
+                    documento, emissao, vencimento, ats, tipo, boleto,
+                    valor_doc, juros, multa, tarifa, valor_total
+                ])
+                continue
+        except Exception as e:
+            logger.debug(f"Erro ao processar título CART na linha {linha_num}: {e}")
+    return len(dados)
+
+def classificar_passada_unica(linhas):
+    dados = []
+    contexto = None
+    for linha in linhas:
+        linha = linha.strip()
+        if len(linha) < 5:
+            continue
+        registro = classificar_linha(linha)
+        if registro is None:
+            continue
+        if type(registro) is Cliente:
+            contexto = registro
+        elif contexto is not None and contexto.nome:
+            dados.append([*contexto, *registro])
+    return len(dados)
+
+def medir(funcao, linhas):
+    inicio = time.perf_counter()
+    encontrados = funcao(linhas)
+    return encontrados, time.perf_counter() - inicio
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    linhas = gerar_corpus(total)
+    print(f"Corpus sintético: {len(linhas)} linhas")
+
+    resultados = {}
+    for nome, funcao in (("cascata", classificar_cascata), ("passada única", classificar_passada_unica)):
+        encontrados, segundos = medir(funcao, linhas)
+        resultados[nome] = encontrados
+        print(f"{nome:>14}: {segundos:6.2f}s  {len(linhas) / segundos:12,.0f} linhas/s  ({encontrados} registros)")
+
+    if len(set(resultados.values())) != 1:
+        sys.exit("Resultados diferentes entre as duas implementações")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Benchmark dos formatos de saída: tempo de escrita e tamanho do arquivo.
+
+Extrai as linhas de um corpus sintético uma única vez e grava a mesma
+lista em cada formato de FORMATOS_SAIDA, em memória. Formatos gravados linha
+a linha recebem as linhas; xlsx (openpyxl) e parquet passam pelo DataFrame,
+e o tempo de montá-lo entra na medição.
+
+Uso: python benchmarks/bench_formatos.py [numero_de_linhas]
+"""
+import copy
+import logging
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pandas as pd
+
+from app import (FORMATOS_SAIDA, BufferColunar, combinar_paginas, escrever_planilha, escrever_xlsx_streaming,
+                 formato_disponivel, parsear_pagina)
+from bench_classificador import gerar_corpus
+
+def gravar_dataframe(formato, registros, saida):
+    dados = BufferColunar()
+    for linha in registros:
+        dados.append(linha)
+    df = dados.para_dataframe()
+    if formato == "parquet":
+        df.to_parquet(saida, index=False)
+    else:
+        with pd.ExcelWriter(saida, engine="openpyxl") as writer:
+            escrever_planilha(writer, df, "Pendências")
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    linhas = gerar_corpus(total)
+    paginas = ["\n".join(linhas[i:i + 50]) for i in range(0, len(linhas), 50)]
+    registros = list(combinar_paginas(parsear_pagina(texto, n) for n, texto in enumerate(paginas, 1)))
+    print(f"{len(registros)} títulos")
+
+    casos = [(nome, escritor) for nome, (_, _, escritor) in FORMATOS_SAIDA.items()]
+    casos.insert(1, ("xlsx streaming", escrever_xlsx_streaming))
+    for nome, escritor in casos:
+        if not formato_disponivel(nome.split()[0]):
+            print(f"{nome:>15}: indisponível")
+            continue
+        # Os escritores convertem as linhas no lugar
+        entrada = copy.deepcopy(registros)
+        saida = BytesIO()
+        inicio = time.perf_counter()
+        if escritor is None:
+            gravar_dataframe(nome, entrada, saida)
+        else:
+            escritor(entrada, saida)
+        segundos = time.perf_counter() - inicio
+        tamanho = saida.getbuffer().nbytes
+        print(f"{nome:>15}: {segundos:7.2f}s  {len(registros) / segundos:10,.0f} linhas/s  {tamanho / 1024 / 1024:7.2f} MiB")
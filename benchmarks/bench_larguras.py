@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Benchmark do ajuste de larguras: varredura das células x cálculo no DataFrame.
+
+Monta o DataFrame de um corpus sintético, grava a planilha com openpyxl e
+mede as duas formas de calcular as larguras das colunas sobre a mesma planilha.
+
+Uso: python benchmarks/bench_larguras.py [numero_de_linhas]
+"""
+import logging
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pandas as pd
+
+from app import BufferColunar, combinar_paginas, larguras_colunas, parsear_pagina
+from bench_classificador import gerar_corpus
+
+def larguras_por_celula(worksheet):
+    """Varredura anterior: str() e len() em cada célula da planilha"""
+    larguras = []
+    for column in worksheet.columns:
+        max_length = 0
+        for cell in column:
+            try:
+                if len(str(cell.value)) > max_length:
+                    max_length = len(str(cell.value))
+            except:
+                pass
+        larguras.append(min(max_length + 2, 50))
+    return larguras
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    linhas = gerar_corpus(total)
+    paginas = ["\n".join(linhas[i:i + 50]) for i in range(0, len(linhas), 50)]
+    dados = BufferColunar()
+    for linha in combinar_paginas(parsear_pagina(texto, n) for n, texto in enumerate(paginas, 1)):
+        dados.append(linha)
+    df = dados.para_dataframe()
+
+    with pd.ExcelWriter(BytesIO(), engine="openpyxl") as writer:
+        inicio = time.perf_counter()
+        df.to_excel(writer, index=False, sheet_name="Pendências")
+        escrita = time.perf_counter() - inicio
+        worksheet = writer.sheets["Pendências"]
+
+        inicio = time.perf_counter()
+        por_celula = larguras_por_celula(worksheet)
+        segundos_celulas = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        vetorizado = larguras_colunas(df)
+        segundos_df = time.perf_counter() - inicio
+
+    print(f"{len(df)} títulos; to_excel: {escrita:.2f}s")
+    print(f"   por célula: {segundos_celulas:7.3f}s  {por_celula}")
+    print(f"    DataFrame: {segundos_df:7.3f}s  {vetorizado}  ({segundos_celulas / segundos_df:.0f}x)")
+    # Só as datas diferem: dd/mm/aaaa em vez do str() do datetime
+    print("Colunas diferentes:", [df.columns[i] for i, (a, b) in enumerate(zip(por_celula, vetorizado)) if a != b])
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Benchmark do custo de logging no laço de parse, com o logger em INFO.
+
+Compara o parse anterior (um logger.info com f-string por cliente, por título
+e por página, e o f-string do debug montado nas primeiras linhas) com o
+parsear_pagina atual, que em INFO só registra o resumo do documento. As
+mensagens vão para um handler real gravando em /dev/null, então o custo de
+formatação e emissão entra na medição.
+
+Uso: python benchmarks/bench_log_parse.py [numero_de_linhas]
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app import Cliente, classificar_linha, combinar_paginas, logger, parsear_pagina
+from bench_classificador import gerar_corpus
+
+LINHAS_POR_PAGINA = 50
+
+def parsear_pagina_anterior(texto, page_num):
+    """Laço anterior: mensagens por linha montadas mesmo com o nível desativado"""
+    orfaos = []
+    registros = []
+    contexto_final = None
+
+    linhas = texto.split("\n")
+    logger.info(f"Processando {len(linhas)} linhas da página {page_num}")
+
+    for linha_num, linha in enumerate(linhas, 1):
+        linha = linha.strip()
+        if len(linha) < 5:
+            continue
+        if linha_num <= 10:
+            logger.debug(f"Página {page_num}, Linha {linha_num}: {linha}")
+
+        registro = classificar_linha(linha)
+        if registro is None:
+            continue
+
+        if type(registro) is Cliente:
+            contexto_final = registro
+            logger.info(f"Cliente encontrado: {registro.codigo} - {registro.nome}")
+        elif contexto_final is None:
+            orfaos.append(list(registro))
+            logger.info(f"Título {registro.tipo} encontrado: {registro.documento}")
+        elif contexto_final.nome:
+            registros.append([*contexto_final, *registro])
+            logger.info(f"Título {registro.tipo} encontrado: {registro.documento} - {contexto_final.nome}")
+
+    return orfaos, registros, contexto_final
+
+def medir(funcao, paginas):
+    inicio = time.perf_counter()
+    total = sum(1 for _ in combinar_paginas(funcao(texto, numero) for numero, texto in enumerate(paginas, 1)))
+    return total, time.perf_counter() - inicio
+
+if __name__ == "__main__":
+    total_linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    linhas = gerar_corpus(total_linhas)
+    paginas = ["\n".join(linhas[i:i + LINHAS_POR_PAGINA]) for i in range(0, len(linhas), LINHAS_POR_PAGINA)]
+
+    # Saída real de log (formatação + escrita), como em produção com nível INFO
+    with open(os.devnull, "w") as destino:
+        handler = logging.StreamHandler(destino)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        raiz = logging.getLogger()
+        raiz.handlers[:] = [handler]
+        raiz.setLevel(logging.INFO)
+        logger.setLevel(logging.INFO)
+
+        print(f"Corpus sintético: {len(linhas)} linhas em {len(paginas)} páginas, log em INFO")
+        resultados = {}
+        for nome, funcao in (("por linha", parsear_pagina_anterior), ("resumo", parsear_pagina)):
+            encontrados, segundos = medir(funcao, paginas)
+            resultados[nome] = encontrados
+            print(f"{nome:>10}: {segundos:6.2f}s  {len(linhas) / segundos:12,.0f} linhas/s  ({encontrados} registros)")
+
+    if len(set(resultados.values())) != 1:
+        sys.exit("Resultados diferentes entre as duas implementações")
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Benchmark do pipeline de conversão em relatórios sintéticos de 1 a 2000 páginas.
+
+Para cada tamanho gera um PDF com benchmarks/gerar_relatorio.py (linhas de
+cliente, BANC e CART no formato das regex) e mede separadamente cada etapa
+(extração do texto, parse, DataFrame e Excel) e a conversão completa por
+POST / no cliente de testes do Flask, com os caches desativados. Cada medição
+registra o melhor tempo das repetições, a vazão e o pico de memória (maior RSS
+acima do início da etapa). O resultado sai em JSON para comparar commits:
+
+    python benchmarks/bench_pipeline.py --saida antes.json
+    python benchmarks/bench_pipeline.py --comparar antes.json
+
+A extração por etapas é sempre serial; --workers vale só para a conversão HTTP.
+
+Uso: python benchmarks/bench_pipeline.py [--paginas 1,10,100,500,2000] [--backend pdfium]
+     [--workers N] [--repeticoes N] [--saida resultado.json] [--comparar anterior.json]
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pandas as pd
+
+from app import (VERSAO_PARSER, BufferColunar, abrir_pdf, app, combinar_paginas, escrever_planilha,
+                 parsear_pagina)
+from gerar_relatorio import escrever_pdf, linhas_relatorio
+
+def _rss():
+    """RSS atual do processo em bytes, ou None fora do Linux"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+class PicoMemoria:
+    """Maior RSS durante o bloco, amostrado por uma thread a cada poucos milissegundos"""
+
+    INTERVALO = 0.005
+
+    def __enter__(self):
+        self.inicial = self.pico = _rss()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+        self._thread.start()
+        return self
+
+    def _amostrar(self):
+        while not self._parar.wait(self.INTERVALO):
+            self.pico = max(self.pico, _rss())
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+        if self.inicial is not None:
+            self.pico = max(self.pico, _rss())
+
+    @property
+    def mb(self):
+        if self.inicial is None:
+            return None
+        return (self.pico - self.inicial) / 1024 / 1024
+
+def medir(funcao, repeticoes):
+    """Executa funcao repetidas vezes; retorna (resultado, melhor tempo, maior pico em MB)"""
+    tempos = []
+    pico = None
+    resultado = None
+    for _ in range(repeticoes):
+        resultado = None
+        gc.collect()
+        with PicoMemoria() as memoria:
+            inicio = time.perf_counter()
+            resultado = funcao()
+            tempos.append(time.perf_counter() - inicio)
+        if memoria.mb is not None:
+            pico = max(pico or 0.0, memoria.mb)
+    return resultado, min(tempos), pico
+
+def _medicao(segundos, pico, paginas, linhas):
+    return {
+        "segundos": round(segundos, 4),
+        "paginas_por_segundo": round(paginas / segundos, 1) if segundos else None,
+        "linhas_por_segundo": round(linhas / segundos, 1) if segundos else None,
+        "pico_mb": round(pico, 1) if pico is not None else None,
+    }
+
+def extrair_textos(pdf_path, backend):
+    textos = []
+    with abrir_pdf(pdf_path, backend) as pdf:
+        for indice in range(len(pdf)):
+            pagina = pdf.pagina(indice)
+            textos.append(pdf.texto(pagina) or "")
+            pdf.liberar(pagina)
+    return textos
+
+def parsear(textos):
+    return list(combinar_paginas(parsear_pagina(texto, numero) for numero, texto in enumerate(textos, 1)))
+
+def montar_dataframe(registros):
+    dados = BufferColunar()
+    # O buffer converte as linhas no lugar: cada repetição recebe uma cópia
+    for linha in registros:
+        dados.append(list(linha))
+    return dados.para_dataframe()
+
+def gravar_excel(df):
+    saida = BytesIO()
+    with pd.ExcelWriter(saida, engine="openpyxl") as writer:
+        escrever_planilha(writer, df, "Pendências")
+    return saida.getbuffer().nbytes
+
+def converter_http(cliente, conteudo, nome):
+    response = cliente.post("/", data={"file": (BytesIO(conteudo), nome)})
+    if response.status_code != 200:
+        raise RuntimeError(f"POST / retornou {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response
+
+def _server_timing(cabecalho):
+    """Converte "etapa;dur=12.3, ..." em {etapa: milissegundos}"""
+    etapas = {}
+    for item in (cabecalho or "").split(","):
+        nome, _, duracao = item.strip().partition(";dur=")
+        if nome and duracao:
+            etapas[nome] = float(duracao)
+    return etapas
+
+def medir_tamanho(paginas, pasta, backend, repeticoes, cliente):
+    inicio = time.perf_counter()
+    conteudo_paginas = linhas_relatorio(paginas, seed=paginas)
+    pdf_path = os.path.join(pasta, f"sintetico_{paginas}p.pdf")
+    escrever_pdf(conteudo_paginas, pdf_path)
+    gerar_segundos = time.perf_counter() - inicio
+    esperadas = sum(1 for pagina in conteudo_paginas for linha in pagina if " BANC " in linha or " CART " in linha)
+
+    etapas = {}
+    textos, segundos, pico = medir(lambda: extrair_textos(pdf_path, backend), repeticoes)
+    etapas["extrair"] = (segundos, pico)
+    registros, segundos, pico = medir(lambda: parsear(textos), repeticoes)
+    etapas["parse"] = (segundos, pico)
+    if len(registros) != esperadas:
+        raise RuntimeError(f"{paginas} páginas: {len(registros)} títulos extraídos, {esperadas} gerados")
+    df, segundos, pico = medir(lambda: montar_dataframe(registros), repeticoes)
+    etapas["dataframe"] = (segundos, pico)
+    tamanho_xlsx, segundos, pico = medir(lambda: gravar_excel(df), repeticoes)
+    etapas["excel"] = (segundos, pico)
+    del textos, df
+
+    with open(pdf_path, "rb") as arquivo:
+        conteudo = arquivo.read()
+    response, segundos, pico = medir(lambda: converter_http(cliente, conteudo, os.path.basename(pdf_path)), repeticoes)
+    http = _medicao(segundos, pico, paginas, len(registros))
+    http["bytes_resposta"] = len(response.get_data())
+    http["server_timing_ms"] = _server_timing(response.headers.get("Server-Timing"))
+
+    return {
+        "paginas": paginas,
+        "linhas": len(registros),
+        "bytes_pdf": len(conteudo),
+        "bytes_xlsx": tamanho_xlsx,
+        "gerar_segundos": round(gerar_segundos, 3),
+        "etapas": {nome: _medicao(segundos, pico, paginas, len(registros)) for nome, (segundos, pico) in etapas.items()},
+        "http": http,
+    }
+
+def _commit():
+    try:
+        raiz = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=raiz, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def comparar(anterior, atual):
+    """Imprime a variação de tempo de cada etapa em relação a uma execução anterior"""
+    base = {item["paginas"]: item for item in anterior["resultados"]}
+    print(f"\nComparação com {anterior.get('commit') or 'execução anterior'} ({anterior.get('data')}, "
+          f"backend {anterior.get('backend')}):")
+    for item in atual["resultados"]:
+        antigo = base.get(item["paginas"])
+        if antigo is None:
+            continue
+        medicoes = [(nome, antigo["etapas"].get(nome), medicao) for nome, medicao in item["etapas"].items()]
+        medicoes.append(("http", antigo.get("http"), item["http"]))
+        for nome, antes, depois in medicoes:
+            if not antes or not antes["segundos"]:
+                continue
+            variacao = (depois["segundos"] - antes["segundos"]) / antes["segundos"] * 100
+            print(f"  {item['paginas']:>5}p {nome:>10}: {antes['segundos']:9.4f}s -> {depois['segundos']:9.4f}s  "
+                  f"({variacao:+6.1f}%)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de conversão")
+    parser.add_argument("--paginas", default="1,10,100",
+                        help="tamanhos dos relatórios, separados por vírgula (ex.: 1,10,100,500,2000)")
+    parser.add_argument("--backend", default=app.config["PDF_BACKEND"], help="backend de extração")
+    parser.add_argument("--workers", type=int, default=1, help="processos de extração na conversão HTTP")
+    parser.add_argument("--repeticoes", type=int, default=1, help="execuções por medição (vale a melhor)")
+    parser.add_argument("--saida", help="arquivo JSON de resultado (padrão: saída padrão)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    # Sem caches nem índice: cada conversão paga o pipeline inteiro. Sem limites de
+    # admissão: as repetições do mesmo cliente não podem ser recusadas
+    app.config.update(CACHE_ENABLED=False, PAGE_CACHE_ENABLED=False, INDEX_ENABLED=False,
+                      RATE_LIMIT_PER_MINUTE=0, PAGE_BUDGET=0,
+                      PDF_BACKEND=args.backend, PDF_WORKERS=args.workers)
+    cliente = app.test_client()
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as pasta:
+        for paginas in (int(valor) for valor in args.paginas.split(",")):
+            item = medir_tamanho(paginas, pasta, args.backend, args.repeticoes, cliente)
+            resultados.append(item)
+            resumo = "  ".join(f"{nome} {medicao['segundos']:.3f}s" for nome, medicao in item["etapas"].items())
+            print(f"{paginas:>5} páginas, {item['linhas']:>7} títulos: {resumo}  http {item['http']['segundos']:.3f}s "
+                  f"({item['http']['paginas_por_segundo']} páginas/s)", file=sys.stderr)
+
+    relatorio = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "versao_parser": VERSAO_PARSER,
+        "backend": args.backend,
+        "workers": args.workers,
+        "repeticoes": args.repeticoes,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        # Pico de RSS do processo inteiro (ru_maxrss em KiB no Linux)
+        "rss_maximo_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "resultados": resultados,
+    }
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as destino:
+            destino.write(texto + "\n")
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as origem:
+            comparar(json.load(origem), relatorio)
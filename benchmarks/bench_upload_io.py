@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Operações de arquivo na pasta temporária durante uma conversão via POST /.
+
+Uso: python benchmarks/bench_upload_io.py relatorio.pdf
+"""
+import logging
+import os
+import sys
+import tempfile
+from collections import Counter
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Sem cache, para medir só o caminho de conversão
+os.environ["CACHE_ENABLED"] = "0"
+os.environ["PAGE_CACHE_ENABLED"] = "0"
+
+import app
+
+logging.disable(logging.INFO)
+
+def origem():
+    """Classifica a operação pelo módulo que a originou"""
+    quadro = sys._getframe(2)
+    while quadro is not None:
+        if "openpyxl" in quadro.f_code.co_filename:
+            return "openpyxl (arquivo interno da planilha)"
+        quadro = quadro.f_back
+    return "aplicação"
+
+if __name__ == "__main__":
+    with open(sys.argv[1], "rb") as f:
+        dados = f.read()
+
+    cliente = app.app.test_client()
+    # Aquecimento: imports tardios e arquivos de dados das bibliotecas
+    cliente.post("/", data={"file": (BytesIO(dados), "relatorio.pdf")})
+
+    pasta = tempfile.gettempdir()
+    operacoes = Counter()
+
+    def auditar(evento, args):
+        if evento == "open" and args[0] is not None and str(args[0]).startswith(pasta):
+            escrita = isinstance(args[2], int) and args[2] & (os.O_WRONLY | os.O_RDWR)
+            escrita = escrita or any(c in str(args[1] or "") for c in "wa+")
+            operacoes[(origem(), "open (escrita)" if escrita else "open (leitura)")] += 1
+        elif evento in ("os.remove", "os.rename", "shutil.copyfile"):
+            operacoes[(origem(), evento)] += 1
+
+    sys.addaudithook(auditar)
+    resposta = cliente.post("/", data={"file": (BytesIO(dados), "relatorio.pdf")})
+
+    print(f"Status {resposta.status_code}: PDF {len(dados)} bytes -> XLSX {len(resposta.data)} bytes")
+    for (quem, operacao), total in sorted(operacoes.items()):
+        print(f"  {quem:<40} {operacao:<16} {total}")
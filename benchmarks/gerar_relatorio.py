@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Gera um PDF sintético no layout do relatório de pendências financeiras.
+
+Cada página tem o cabeçalho do relatório seguido de blocos de cliente com
+títulos BANC/CART e a linha de total; os blocos continuam de uma página para
+a outra, como no relatório real.
+
+Uso: python benchmarks/gerar_relatorio.py numero_de_paginas destino.pdf [semente]
+"""
+import random
+import sys
+import zlib
+
+NOMES = ["JOAO DA SILVA LTDA", "MERCADO BOM PRECO", "COMERCIAL SANTOS & FILHOS", "A. B. C. DISTRIBUIDORA"]
+CIDADES = ["PALMAS", "PORTO NACIONAL", "GURUPI"]
+
+def _valor(rnd):
+    return f"{rnd.randint(0, 99999) / 100:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def linhas_relatorio(paginas, seed=1, linhas_por_pagina=50):
+    """Lista de páginas, cada uma uma lista de linhas de texto"""
+    rnd = random.Random(seed)
+    codigo = 1000
+    pendente = []
+
+    def bloco():
+        nonlocal codigo
+        codigo += rnd.randint(1, 9)
+        linhas = [f"{codigo} {rnd.choice(NOMES)} (63){rnd.randint(3000, 99999)}-{rnd.randint(1000, 9999)} {rnd.choice(CIDADES)}"]
+        for i in range(rnd.randint(1, 30)):
+            documento = f"{rnd.randint(1, 99999)}.{i:02d}"
+            emissao = f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2024"
+            vencimento = f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2025"
+            valores = " ".join(_valor(rnd) for _ in range(5))
+            if rnd.random() < 0.6:
+                linhas.append(f"{documento} {emissao} {vencimento} {rnd.randint(0, 400)} BANC {rnd.randint(100000, 999999)} {valores}")
+            else:
+                linhas.append(f"{documento} {emissao} {vencimento} {rnd.randint(0, 400)} CART {valores}")
+        linhas.append(f"TOTAL CLIENTE {rnd.randint(1, 9999)},00")
+        return linhas
+
+    resultado = []
+    for _ in range(paginas):
+        pagina = ["Pendencia Financeira - LB Palmas",
+                  "Docto Emissao Vencto ATS Tipo Boleto Valor Juros Multa Tarifa Total"]
+        while len(pagina) < linhas_por_pagina:
+            if not pendente:
+                pendente = bloco()
+            pagina.append(pendente.pop(0))
+        resultado.append(pagina)
+    return resultado
+
+def escrever_pdf(paginas, destino):
+    """Grava as páginas como um PDF mínimo (A4 paisagem, Helvetica 8pt)"""
+    objetos = []
+
+    def adicionar(corpo):
+        objetos.append(corpo)
+        return len(objetos)
+
+    fonte = adicionar(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    conteudos = []
+    for pagina in paginas:
+        operadores = ["BT /F1 8 Tf 10 TL 20 570 Td"]
+        for linha in pagina:
+            texto = linha.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            operadores.append(f"({texto}) Tj T*")
+        operadores.append("ET")
+        dados = zlib.compress("\n".join(operadores).encode("latin-1"))
+        conteudos.append(adicionar(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(dados) + dados + b"\nendstream"))
+
+    raiz_paginas = len(objetos) + len(paginas) + 1
+    filhos = [
+        adicionar(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 842 595] /Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+                  % (raiz_paginas, fonte, conteudo))
+        for conteudo in conteudos
+    ]
+    adicionar(b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % f for f in filhos) + b"] /Count %d >>" % len(filhos))
+    catalogo = adicionar(b"<< /Type /Catalog /Pages %d 0 R >>" % raiz_paginas)
+
+    saida = bytearray(b"%PDF-1.4\n")
+    posicoes = []
+    for numero, corpo in enumerate(objetos, 1):
+        posicoes.append(len(saida))
+        saida += b"%d 0 obj\n" % numero + corpo + b"\nendobj\n"
+    inicio_xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for posicao in posicoes:
+        saida += b"%010d 00000 n \n" % posicao
+    saida += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, catalogo, inicio_xref)
+    with open(destino, "wb") as f:
+        f.write(saida)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    semente = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    escrever_pdf(linhas_relatorio(int(sys.argv[1]), semente), sys.argv[2])
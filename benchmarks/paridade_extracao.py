@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Confere se os backends de extração produzem as mesmas linhas.
+
+Extrai os registros de cada PDF com todos os backends disponíveis e compara
+linha a linha com o pdfplumber (referência). Sem PDFs informados, gera
+relatórios sintéticos com benchmarks/gerar_relatorio.py. Termina com erro
+se algum backend divergir ou não puder ser carregado. A mesma comparação roda
+no pytest em tests/test_paridade.py.
+
+Uso: python benchmarks/paridade_extracao.py [relatorio.pdf ...]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app import EXTRATORES, app, combinar_paginas, gerar_paginas
+from gerar_relatorio import escrever_pdf, linhas_relatorio
+
+REFERENCIA = "pdfplumber"
+
+def extrair(pdf_path, backend):
+    inicio = time.perf_counter()
+    linhas = list(combinar_paginas(gerar_paginas(pdf_path, workers=1, backend=backend)))
+    return linhas, time.perf_counter() - inicio
+
+def comparar(pdf_path, backends):
+    """Compara os backends no PDF; retorna o número de divergências (backends indisponíveis contam)"""
+    referencia, segundos_ref = extrair(pdf_path, REFERENCIA)
+    print(f"{os.path.basename(pdf_path)}: {len(referencia)} registros")
+    print(f"  {REFERENCIA:>12}: {segundos_ref:7.2f}s")
+    divergencias = 0
+    for backend in backends:
+        try:
+            linhas, segundos = extrair(pdf_path, backend)
+        except Exception as e:
+            divergencias += 1
+            print(f"  {backend:>12}: indisponível ({e})")
+            continue
+        diferentes = [i for i, (a, b) in enumerate(zip(referencia, linhas)) if a != b]
+        if len(linhas) != len(referencia) or diferentes:
+            divergencias += 1
+            print(f"  {backend:>12}: DIVERGENTE ({len(linhas)} registros, {len(diferentes)} linhas diferentes)")
+            for i in diferentes[:5]:
+                print(f"      {REFERENCIA}: {referencia[i]}")
+                print(f"      {backend}: {linhas[i]}")
+        else:
+            print(f"  {backend:>12}: {segundos:7.2f}s  idêntico ({segundos_ref / segundos:.1f}x)")
+    return divergencias
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    # O cache por página esconderia o custo (e as diferenças) da extração
+    app.config["PAGE_CACHE_ENABLED"] = False
+    backends = [nome for nome in EXTRATORES if nome != REFERENCIA]
+
+    with tempfile.TemporaryDirectory() as pasta:
+        pdfs = sys.argv[1:]
+        if not pdfs:
+            for paginas, semente in ((1, 1), (20, 2), (60, 3)):
+                caminho = os.path.join(pasta, f"sintetico_{paginas}p.pdf")
+                escrever_pdf(linhas_relatorio(paginas, semente), caminho)
+                pdfs.append(caminho)
+
+        divergencias = sum(comparar(pdf, backends) for pdf in pdfs)
+
+    if divergencias:
+        sys.exit(f"{divergencias} comparações divergentes")
@@ -0,0 +1,44 @@
+"""Configuração do gunicorn para produção.
+
+O app e as bibliotecas pesadas (pandas, pdfplumber, openpyxl) são importados
+uma vez no processo master (preload_app) e herdados pelos workers no fork,
+então reiniciar ou substituir um worker não paga a importação de novo.
+
+Variáveis de ambiente:
+    PORT                 porta HTTP (padrão 5000)
+    WEB_CONCURRENCY      número de workers (padrão 2)
+    GUNICORN_THREADS     threads por worker (padrão 1 = worker sync)
+    GUNICORN_TIMEOUT     segundos até um worker travado ser reiniciado (padrão 120)
+    GUNICORN_MAX_REQUESTS  reinicia o worker após N requisições (padrão 0 = nunca)
+"""
+import os
+import sys
+import time
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+worker_class = "gthread" if threads > 1 else "sync"
+# Conversões de PDFs grandes podem levar vários segundos
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+preload_app = True
+accesslog = "-"
+
+# A configuração é lida antes do preload: o tempo até when_ready inclui a importação do app
+_inicio_servidor = time.perf_counter()
+
+def when_ready(server):
+    modulo = sys.modules.get("app")
+    importacao = getattr(modulo, "TEMPO_IMPORTACAO", None)
+    detalhe = f" (importação da aplicação: {importacao:.2f}s)" if importacao is not None else ""
+    server.log.info(f"Servidor pronto em {time.perf_counter() - _inicio_servidor:.2f}s{detalhe}, "
+                    f"{workers} workers x {threads} threads, timeout {timeout}s")
+
+def pre_fork(server, worker):
+    worker.inicio_fork = time.perf_counter()
+
+def post_worker_init(worker):
+    worker.log.info(f"Worker {worker.pid} pronto em {time.perf_counter() - worker.inicio_fork:.3f}s")
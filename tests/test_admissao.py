@@ -0,0 +1,54 @@
+"""Controle de admissão: vagas de conversão e cache de resultados."""
+import os
+import sys
+from io import BytesIO
+
+import pytest
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+import app as conversor
+from gerar_relatorio import escrever_pdf, linhas_relatorio
+
+@pytest.fixture
+def cliente(tmp_path, monkeypatch):
+    config = dict(CACHE_ENABLED=True, CACHE_FOLDER=str(tmp_path / "cache"), PAGE_CACHE_ENABLED=False,
+                  INDEX_ENABLED=False, RATE_LIMIT_PER_MINUTE=0, MAX_CONCURRENT_CONVERSIONS=1,
+                  ADMISSION_FOLDER=str(tmp_path / "admissao"), SCRATCH_FOLDER=str(tmp_path / "rascunho"))
+    for chave, valor in config.items():
+        monkeypatch.setitem(conversor.app.config, chave, valor)
+    for nome in ("_vagas_conversao", "_orcamento_paginas", "_cache_resultados", "_espaco_temporario"):
+        monkeypatch.setattr(conversor, nome, None)
+    return conversor.app.test_client()
+
+@pytest.fixture(scope="module")
+def pdfs(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp("pdfs")
+    conteudos = []
+    for seed in (1, 2):
+        caminho = pasta / f"relatorio{seed}.pdf"
+        escrever_pdf(linhas_relatorio(2, seed=seed), str(caminho))
+        conteudos.append(caminho.read_bytes())
+    return conteudos
+
+def _enviar(cliente, conteudo):
+    return cliente.post("/", data={"file": (BytesIO(conteudo), "relatorio.pdf")})
+
+def test_cache_hit_nao_precisa_de_vaga(cliente, pdfs):
+    assert _enviar(cliente, pdfs[0]).headers["X-Cache"] == "MISS"
+    vagas = conversor.vagas_conversao()
+    vaga = vagas.ocupar()
+    try:
+        response = _enviar(cliente, pdfs[0])
+        assert response.status_code == 200
+        assert response.headers["X-Cache"] == "HIT"
+
+        response = _enviar(cliente, pdfs[1])
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+    finally:
+        vagas.liberar(vaga)
+    assert _enviar(cliente, pdfs[1]).status_code == 200
+    assert conversor._conversoes_ativas == 0
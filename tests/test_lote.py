@@ -0,0 +1,61 @@
+"""Conversão em lote sob o orçamento de páginas (PAGE_BUDGET)."""
+import json
+import os
+import pickle
+import sys
+from io import BytesIO
+
+import pytest
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+import app as conversor
+from gerar_relatorio import escrever_pdf, linhas_relatorio
+
+PAGINAS_POR_PDF = 4
+
+@pytest.fixture
+def cliente(tmp_path, monkeypatch):
+    config = dict(CACHE_ENABLED=False, PAGE_CACHE_ENABLED=False, INDEX_ENABLED=False, RATE_LIMIT_PER_MINUTE=0,
+                  PAGE_BUDGET=2 * PAGINAS_POR_PDF, BATCH_WORKERS=1, ADMISSION_FOLDER=str(tmp_path / "admissao"),
+                  SCRATCH_FOLDER=str(tmp_path / "rascunho"))
+    for chave, valor in config.items():
+        monkeypatch.setitem(conversor.app.config, chave, valor)
+    for nome in ("_vagas_conversao", "_orcamento_paginas", "_espaco_temporario"):
+        monkeypatch.setattr(conversor, nome, None)
+    return conversor.app.test_client()
+
+@pytest.fixture(scope="module")
+def pdf(tmp_path_factory):
+    caminho = tmp_path_factory.mktemp("pdfs") / "relatorio.pdf"
+    escrever_pdf(linhas_relatorio(PAGINAS_POR_PDF), str(caminho))
+    return caminho.read_bytes()
+
+def _enviar(cliente, arquivos):
+    return cliente.post("/lote", data={"files": [(BytesIO(conteudo), nome) for nome, conteudo in arquivos]})
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_lote_maior_que_orcamento(cliente, pdf, workers, monkeypatch):
+    monkeypatch.setitem(conversor.app.config, "BATCH_WORKERS", workers)
+    response = _enviar(cliente, [(f"r{numero}.pdf", pdf) for numero in range(5)])
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    resumo = json.loads(response.headers["X-Lote-Resumo"])
+    assert [item["erro"] for item in resumo] == [None] * 5
+    assert all(item["registros"] > 0 for item in resumo)
+    assert conversor.orcamento_paginas().em_uso == 0
+
+def test_pdf_maior_que_orcamento_vira_erro_do_item(cliente, pdf, monkeypatch):
+    monkeypatch.setitem(conversor.app.config, "PAGE_BUDGET", PAGINAS_POR_PDF - 1)
+    response = _enviar(cliente, [("grande.pdf", pdf)])
+
+    assert response.status_code == 500
+    assert "máximo por conversão" in response.get_json()["arquivos"][0]["erro"]
+    assert conversor.orcamento_paginas().em_uso == 0
+
+def test_limite_excedido_sobrevive_ao_pickle():
+    erro = conversor.LimiteExcedido("ocupado", 503, "orcamento_paginas", 5)
+    copia = pickle.loads(pickle.dumps(erro))
+    assert (str(copia), copia.status, copia.motivo, copia.retry_after) == ("ocupado", 503, "orcamento_paginas", 5)
@@ -0,0 +1,39 @@
+"""Paridade dos backends de extração com o pdfplumber (referência)."""
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+import app as conversor
+from gerar_relatorio import escrever_pdf, linhas_relatorio
+
+REFERENCIA = "pdfplumber"
+# Pacote opcional de cada backend: sem ele o teste é pulado, não aprovado
+DEPENDENCIAS = {"pdfium": "pypdfium2"}
+
+@pytest.fixture(autouse=True)
+def sem_cache_paginas(monkeypatch):
+    # O cache por página esconderia as diferenças da extração
+    monkeypatch.setitem(conversor.app.config, "PAGE_CACHE_ENABLED", False)
+
+@pytest.fixture(scope="module", params=[(1, 1), (20, 2), (60, 3)], ids=lambda p: f"{p[0]}p")
+def pdf(request, tmp_path_factory):
+    paginas, semente = request.param
+    caminho = tmp_path_factory.mktemp("pdfs") / f"sintetico_{paginas}p.pdf"
+    escrever_pdf(linhas_relatorio(paginas, semente), str(caminho))
+    return str(caminho)
+
+def extrair(pdf_path, backend):
+    return list(conversor.combinar_paginas(conversor.gerar_paginas(pdf_path, workers=1, backend=backend)))
+
+@pytest.mark.parametrize("backend", [nome for nome in conversor.EXTRATORES if nome != REFERENCIA])
+def test_backend_igual_a_referencia(pdf, backend):
+    if backend in DEPENDENCIAS:
+        pytest.importorskip(DEPENDENCIAS[backend])
+    referencia = extrair(pdf, REFERENCIA)
+    assert referencia
+    assert extrair(pdf, backend) == referencia